@@ -1,18 +1,106 @@
 # packages/backend/app/flask/routes_camera_stream.py
 import cv2
+import numpy as np
 import time
 import sys
 import threading
-import base64
-from flask import Blueprint, Response, current_app
+import logging
+from contextlib import contextmanager
+from flask import Blueprint, Response, stream_with_context
 from flask_cors import cross_origin
+from ..processors.stream_scheduler import stream_scheduler
+
+try:
+    import simplejpeg  # libjpeg-turbo binding, faster than cv2.imencode
+except ImportError:
+    simplejpeg = None
+
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR, TJSAMP_420, TJFLAG_FASTDCT
+    _turbo = TurboJPEG()  # PyTurboJPEG, dipakai kalau simplejpeg tidak ada
+except Exception:  # paket tidak ada atau libturbojpeg tidak ditemukan
+    _turbo = None
+
+try:
+    from nvjpeg import NvJpeg  # pynvjpeg (nvjpeg-python), encode JPEG di GPU (CUDA)
+except ImportError:
+    NvJpeg = None
+
+# Buffer frame yang didaur ulang untuk cap.read(): 1 dibaca + 1 di slot + maks. 2 di encoder
+FRAME_POOL_SIZE = 4
+
+# Di atas ~720p encode GPU lebih cepat walau ada biaya copy host<->device
+GPU_ENCODE_MIN_PIXELS = 1280 * 720
+
+# Bagian multipart yang tetap, di-encode sekali saja (bukan per frame per client)
+MJPEG_BOUNDARY = "frame"
+MJPEG_PART_PREFIX = (b"--" + MJPEG_BOUNDARY.encode() + b"\r\n"
+                     b"Content-Type: image/jpeg\r\n"
+                     b"Content-Length: ")
+MJPEG_PART_SEP = b"\r\n\r\n"
+MJPEG_PART_TAIL = b"\r\n"
 
 bp_camera_stream = Blueprint("camera_stream", __name__)
 
+
+class RateLimitedLog:
+    """Log paling banyak sekali per `interval` detik untuk error yang bisa terjadi tiap frame.
+
+    Pesan yang dilewati hanya dihitung (tanpa format string) dan jumlahnya disertakan
+    pada log berikutnya.
+    """
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self._last = 0.0
+        self._suppressed = 0
+
+    def __call__(self, level, msg, *args):
+        now = time.monotonic()
+        if now - self._last < self.interval:
+            self._suppressed += 1
+            return
+        if self._suppressed:
+            msg += " (%d similar messages suppressed)"
+            args += (self._suppressed,)
+        self._last = now
+        self._suppressed = 0
+        logging.log(level, msg, *args)
+
+
+def encode_jpeg(frame, jpeg_quality, as_bytes=True, fast_dct=True):
+    """Encode BGR frame ke JPEG di CPU: simplejpeg, lalu PyTurboJPEG, lalu cv2.
+
+    as_bytes=False boleh mengembalikan memoryview read-only atas buffer cv2 tanpa copy
+    .tobytes(), cukup untuk konsumen yang menerima buffer protocol (mis. base64.b64encode).
+    fast_dct=True memakai DCT integer SIMD libjpeg-turbo (sedikit kurang akurat) + chroma 4:2:0.
+
+    Ketiga backend melepas GIL selama kompresi (simplejpeg `nogil`, ctypes, cv2), jadi
+    panggil fungsi ini di luar lock apa pun supaya thread encode benar-benar paralel.
+    """
+    if simplejpeg is not None:
+        if not frame.flags.c_contiguous:
+            frame = np.ascontiguousarray(frame)  # simplejpeg menolak view/crop yang strided
+        return simplejpeg.encode_jpeg(
+            frame, quality=jpeg_quality, colorspace="BGR", colorsubsampling="420", fastdct=fast_dct
+        )
+    if _turbo is not None:
+        return _turbo.encode(
+            frame, quality=jpeg_quality, pixel_format=TJPF_BGR,
+            jpeg_subsample=TJSAMP_420, flags=TJFLAG_FASTDCT if fast_dct else 0,
+        )
+    ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+    if not ok:
+        return None
+    return buf.tobytes() if as_bytes else memoryview(buf).toreadonly()
+
+
 class _SharedCamera:
     """Singleton per camera index, share VideoCapture + thread ke banyak client."""
     _instances = {}
     _global_lock = threading.Lock()
+    # (platform, index) -> backend yang terakhir berhasil dibuka; dicoba pertama kali saat reopen
+    _backend_cache = {}
 
     def __new__(cls, index=0, width=640, height=480, backend=None):
         key = (index, width, height, backend)
@@ -24,10 +112,34 @@ class _SharedCamera:
                 obj.height = height
                 obj.backend = backend
                 obj.cap = None
-                obj.frame_lock = threading.Lock()
-                obj.latest_jpeg = None  # bytes (JPEG)
+                obj.passthrough_mjpg = True  # boleh pakai JPEG dari kamera tanpa decode+re-encode
+                obj.jpeg_quality = 85
+                obj.fast_dct = True  # encode_jpeg(fast_dct=...) untuk frame yang di-encode di CPU
+                obj.warmup_ms = 150  # batas atas warm-up setelah device dibuka
+                obj.raw_mjpeg = False  # True kalau cap.read() mengembalikan JPEG mentah
+                obj.small_buffer = False  # True kalau driver menerima CAP_PROP_BUFFERSIZE=1
+                obj.gpu_encoder = None  # NvJpeg, dibuat sekali per kamera
+                obj.latest_jpeg = None  # JPEG bytes / memoryview read-only, tidak diubah -> rebinding atomic
+                obj._seq = 0  # naik setiap ada frame baru
+                # Frame BGR terbaru untuk konsumen satu proses (tanpa decode JPEG); read-only,
+                # diisi hanya selama ada konsumen BGR terdaftar (add_bgr_consumer)
+                obj.latest_bgr = None
+                obj.bgr_consumers = 0
+                obj._bgr_memo = (None, None)  # (JPEG, ndarray hasil decode) untuk mode passthrough
+                obj.frame_cond = threading.Condition()  # dibangunkan tiap frame baru
+                obj.client_count = 0  # jumlah konsumen aktif; 0 -> tidak perlu encode
+                obj.client_lock = threading.Lock()
+                obj.listeners = ()  # callback(jpeg) per frame baru; tuple baru tiap perubahan (tanpa lock saat iterasi)
+                # Slot 1 frame (overwrite, buang yang lama) dari thread grab ke worker encode bersama
+                obj._pending = None  # (capture_seq, frame BGR)
+                obj._frame_pool = []  # ndarray bekas yang boleh ditimpa cap.read() berikutnya
+                obj._capture_seq = 0
+                obj._published_seq = 0  # capture_seq dari frame terakhir yang dipublish
+                obj.pending_lock = threading.Lock()
                 obj.stop_evt = threading.Event()
                 obj.thread = None
+                obj._encode_error_log = RateLimitedLog()
+                obj._listener_error_log = RateLimitedLog()
                 cls._instances[key] = obj
             return cls._instances[key]
 
@@ -39,63 +151,335 @@ class _SharedCamera:
         else:
             default_backend = cv2.CAP_V4L2
 
-        backend = self.backend if self.backend is not None else default_backend
-        self.cap = cv2.VideoCapture(self.index, backend)
-        if not self.cap or not self.cap.isOpened():
+        cache_key = (sys.platform, self.index)
+        if self.backend is not None:
+            candidates = [self.backend]
+        else:
+            cached = self._backend_cache.get(cache_key)
+            candidates = [default_backend, cv2.CAP_ANY]
+            if cached is not None:
+                candidates = [cached] + [b for b in candidates if b != cached]
+
+        self.cap = None
+        for backend in candidates:
+            cap = cv2.VideoCapture(self.index, backend)
+            if cap.isOpened():
+                self.cap = cap
+                break
+            cap.release()
+            if self._backend_cache.get(cache_key) == backend:
+                del self._backend_cache[cache_key]  # backend cache sudah tidak valid
+        if self.cap is None:
             raise RuntimeError(f"Cannot open camera {self.index}")
+        if self.backend is None:
+            self._backend_cache[cache_key] = backend
+        # Minta MJPG langsung dari kamera (UVC) supaya bisa diteruskan tanpa re-encode
+        # dan tanpa konversi YUYV->BGR di software. Backend yang tidak mendukung cukup diabaikan.
+        if not self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG")):
+            logging.debug("[CameraStream] camera %s: MJPG FOURCC not supported", self.index)
         self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
         self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
-        time.sleep(0.15)  # warm-up
+        # Antrian driver 1 frame: read() selalu dapat frame terbaru, bukan yang basi
+        self.small_buffer = bool(self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1))
+        if not self.small_buffer:
+            logging.debug("[CameraStream] camera %s: CAP_PROP_BUFFERSIZE not supported", self.index)
+        self.raw_mjpeg = False
+        fourcc = int(self.cap.get(cv2.CAP_PROP_FOURCC))
+        if self.passthrough_mjpg and backend == cv2.CAP_V4L2 and fourcc == cv2.VideoWriter_fourcc(*"MJPG"):
+            # V4L2 bisa mengembalikan buffer MJPG apa adanya kalau konversi RGB dimatikan
+            self.raw_mjpeg = bool(self.cap.set(cv2.CAP_PROP_CONVERT_RGB, 0))
+        # Warm-up: baca sampai frame tidak hitam lagi (banyak kamera siap dalam 30-50 ms,
+        # yang lambat bisa >500 ms), dibatasi warmup_ms. Buffer MJPG mentah tidak bisa dinilai
+        # kecerahannya, jadi read() yang berhasil sudah dianggap siap.
+        deadline = time.monotonic() + self.warmup_ms / 1000.0
+        while time.monotonic() < deadline:
+            ok, frame = self.cap.read()
+            if ok and frame is not None and (self.raw_mjpeg or frame.mean() > 4):
+                break
+            time.sleep(0.01)
+
+    @staticmethod
+    def _as_raw_jpeg(frame):
+        """Return JPEG (memoryview read-only, tanpa copy) kalau frame adalah buffer MJPG mentah
+        (1 x N uint8), selain itu None. Frame tersebut tidak boleh didaur ulang setelahnya."""
+        if frame.ndim > 2 or (frame.ndim == 2 and frame.shape[0] != 1):
+            return None
+        data = frame.reshape(-1)
+        if data.size < 4 or data[0] != 0xFF or data[1] != 0xD8:
+            return None
+        return memoryview(data).toreadonly()
+
+    def _get_gpu_encoder(self):
+        if self.gpu_encoder is None and NvJpeg is not None:
+            try:
+                self.gpu_encoder = NvJpeg()
+            except Exception as e:
+                logging.warning("[CameraStream] nvjpeg unavailable, using CPU encode: %s", e)
+                self.gpu_encoder = False
+        return self.gpu_encoder or None
+
+    def _encode(self, frame, jpeg_quality):
+        """Encode BGR frame ke JPEG bytes: nvjpeg untuk frame besar, selain itu encode_jpeg()."""
+        h, w = frame.shape[:2]
+        if h > self.height or w > self.width:
+            # Driver membulatkan ke mode yang lebih besar: kecilkan dulu (INTER_AREA, SIMD)
+            # karena biaya encode sebanding jumlah piksel
+            frame = cv2.resize(frame, (self.width, self.height), interpolation=cv2.INTER_AREA)
+        if frame.shape[0] * frame.shape[1] >= GPU_ENCODE_MIN_PIXELS:
+            encoder = self._get_gpu_encoder()
+            if encoder is not None:
+                return encoder.encode(frame, jpeg_quality)
+        # latest_jpeg boleh berupa memoryview (seperti passthrough), jadi buffer cv2 tidak perlu di-copy
+        return encode_jpeg(frame, jpeg_quality, as_bytes=False, fast_dct=self.fast_dct)
+
+    def _publish(self, jpg, capture_seq):
+        with self.frame_cond:
+            if capture_seq <= self._published_seq:
+                return  # encoder lain sudah mempublish frame yang lebih baru
+            self._published_seq = capture_seq
+            self.latest_jpeg = jpg
+            self._seq += 1
+            self.frame_cond.notify_all()
+        for listener in self.listeners:
+            try:
+                listener(jpg)
+            except Exception as e:
+                self._listener_error_log(logging.WARNING, "[CameraStream] frame listener error: %s", e)
+
+    def _invalidate_jpeg(self):
+        """Buang JPEG terakhir saat encode berhenti (tidak ada client), supaya konsumen yang
+        datang kemudian menunggu frame baru, bukan menerima frame lama yang bisa basi berjam-jam."""
+        with self.frame_cond:
+            self.latest_jpeg = None
+            # Frame yang masih di encoder juga sudah basi: jangan dipublish lagi
+            self._published_seq = self._capture_seq
+
+    def _recycle(self, frame):
+        """Kembalikan frame yang sudah selesai dipakai ke pool untuk cap.read() berikutnya."""
+        # Frame yang pernah dipublish sebagai latest_bgr (read-only) bisa masih dipegang konsumen
+        if frame.flags.writeable and len(self._frame_pool) < FRAME_POOL_SIZE:
+            self._frame_pool.append(frame)
+
+    def _submit(self, frame, capture_seq):
+        with self.pending_lock:
+            dropped, self._pending = self._pending, (capture_seq, frame)
+        if dropped is not None:
+            self._recycle(dropped[1])  # encoder belum sempat mengambilnya; buffer bebas
+        # Encode dikerjakan worker stream_scheduler yang dipakai bersama semua kamera
+        stream_scheduler.submit(self, self._encode_pending)
+
+    def _encode_pending(self):
+        """Dijalankan worker scheduler: ambil frame terbaru dari slot, encode JPEG, publish."""
+        with self.pending_lock:
+            item, self._pending = self._pending, None
+        if item is None or self.stop_evt.is_set():
+            return
+        capture_seq, frame = item
+        try:
+            jpg = self._encode(frame, self.jpeg_quality)
+        except Exception as e:
+            self._encode_error_log(logging.WARNING, "[CameraStream] encode error: %s", e)
+            return
+        finally:
+            self._recycle(frame)
+        if jpg is not None:
+            self._publish(jpg, capture_seq)
 
     def _loop(self, fps=15, jpeg_quality=85):
+        """Producer: hanya grab frame dari device; encode dikerjakan _encode_pending."""
         try:
             self._open()
             interval = 1.0 / max(1.0, fps)
+            # Kamera lebih cepat dari target fps dan antrian driver tidak bisa dibatasi 1 frame:
+            # buang frame basi dengan grab() (tanpa decode) lalu read() hanya yang terbaru
+            drain = 1
+            if not self.small_buffer:
+                cam_fps = self.cap.get(cv2.CAP_PROP_FPS) or 0
+                drain = max(1, int(cam_fps / max(1.0, fps)))
+            # Jadwal berbasis deadline monotonic: waktu capture+encode ikut dihitung dalam interval
+            next_deadline = time.monotonic()
+            jpeg_live = False  # True selama latest_jpeg diperbarui tiap frame
             while not self.stop_evt.is_set():
-                ok, frame = self.cap.read()
+                remaining = next_deadline - time.monotonic()
+                if remaining > 0 and self.stop_evt.wait(remaining):
+                    break
+                next_deadline += interval
+                if time.monotonic() - next_deadline > 2 * interval:
+                    # Tertinggal jauh (kamera lambat): resync, jangan kejar frame yang lewat
+                    next_deadline = time.monotonic() + interval
+                if self.client_count == 0:
+                    if jpeg_live:
+                        self._invalidate_jpeg()
+                        jpeg_live = False
+                    if not self.bgr_consumers:
+                        # Tidak ada yang menonton: cukup grab supaya device tetap hangat
+                        self.cap.grab()
+                        continue
+                else:
+                    jpeg_live = True
+                for _ in range(drain - 1):
+                    self.cap.grab()
+                # Pakai ulang ndarray bekas kalau ada (tanpa alokasi ~6 MB per frame di 1080p);
+                # cv2 otomatis alokasi baru kalau ukuran/tipe tidak cocok
+                buf = self._frame_pool.pop() if self._frame_pool else None
+                ok, frame = self.cap.read(buf)
                 if not ok or frame is None:
-                    time.sleep(0.03)
                     continue
-                ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
-                if ok:
-                    with self.frame_lock:
-                        self.latest_jpeg = buf.tobytes()
-                time.sleep(interval)
+                self._capture_seq += 1
+                jpg = self._as_raw_jpeg(frame) if self.raw_mjpeg else None
+                if jpg is not None:
+                    # JPEG dari kamera: langsung publish, tidak perlu encoder
+                    # Buffer driver dipublish apa adanya (tanpa copy), jadi tidak masuk pool
+                    self._publish(jpg, self._capture_seq)
+                elif self.raw_mjpeg and frame.ndim != 3:
+                    # Buffer mentah tapi bukan JPEG: matikan passthrough, decode seperti biasa
+                    self.raw_mjpeg = False
+                    self.cap.set(cv2.CAP_PROP_CONVERT_RGB, 1)
+                else:
+                    if self.bgr_consumers:
+                        # Dipublish by reference: tidak boleh ditimpa lagi, jadi tidak didaur ulang
+                        frame.flags.writeable = False
+                        with self.client_lock:
+                            # Cek ulang: konsumen terakhir bisa pergi (dan mengosongkan slot) di antaranya
+                            if self.bgr_consumers:
+                                self.latest_bgr = frame
+                    if self.client_count > 0:
+                        self._submit(frame, self._capture_seq)
         except Exception as e:
-            current_app.logger.error(f"[CameraStream] loop error: {e}")
+            # Thread ini tidak punya app context, jadi pakai logging biasa (bukan current_app.logger)
+            logging.error("[CameraStream] loop error: %s", e)
         finally:
             if self.cap:
                 try: self.cap.release()
                 except Exception: pass
             self.cap = None
 
-    def start(self, fps=15, jpeg_quality=85):
+    def start(self, fps=15, jpeg_quality=85, passthrough_mjpg=True, fast_dct=True, warmup_ms=150):
         if self.thread and self.thread.is_alive():
             return
+        self.warmup_ms = max(0, warmup_ms)
+        self.passthrough_mjpg = bool(passthrough_mjpg)
+        self.fast_dct = bool(fast_dct)
+        self.jpeg_quality = jpeg_quality
         self.stop_evt.clear()
         self.thread = threading.Thread(target=self._loop, args=(fps, jpeg_quality), daemon=True)
         self.thread.start()
 
     def stop(self):
         self.stop_evt.set()
+        stream_scheduler.discard(self)
         if self.thread:
             self.thread.join(timeout=1.5)
         self.thread = None
+        self._invalidate_jpeg()
+        self._pending = None
+        self._frame_pool = []
+        self.latest_bgr = None
+        self._bgr_memo = (None, None)
         if self.cap:
             try: self.cap.release()
             except Exception: pass
         self.cap = None
 
+    def add_client(self):
+        with self.client_lock:
+            self.client_count += 1
+
+    def remove_client(self):
+        with self.client_lock:
+            self.client_count = max(0, self.client_count - 1)
+
+    def add_listener(self, callback):
+        """Panggil callback(jpeg) dari thread kamera setiap ada frame baru yang dipublish."""
+        with self.client_lock:
+            self.listeners = self.listeners + (callback,)
+
+    def remove_listener(self, callback):
+        with self.client_lock:
+            self.listeners = tuple(cb for cb in self.listeners if cb is not callback)
+
+    def add_bgr_consumer(self):
+        """Daftarkan konsumen get_latest_bgr(); selama ada, frame BGR dibaca walau tanpa client JPEG."""
+        with self.client_lock:
+            self.bgr_consumers += 1
+
+    def remove_bgr_consumer(self):
+        with self.client_lock:
+            self.bgr_consumers = max(0, self.bgr_consumers - 1)
+            if self.bgr_consumers == 0:
+                # Jangan simpan (dan kembalikan) frame lama setelah konsumen terakhir pergi
+                self.latest_bgr = None
+                self._bgr_memo = (None, None)
+
+    @contextmanager
+    def bgr_consumer(self):
+        """Tandai ada konsumen BGR selama blok berjalan."""
+        self.add_bgr_consumer()
+        try:
+            yield self
+        finally:
+            self.remove_bgr_consumer()
+
+    @contextmanager
+    def client(self):
+        """Tandai ada konsumen aktif selama blok berjalan (frame hanya di-encode kalau ada konsumen)."""
+        self.add_client()
+        try:
+            yield self
+        finally:
+            self.remove_client()
+
+    def is_started(self):
+        """True begitu start() sudah menjalankan capture thread (device mungkin masih dibuka)."""
+        return self.thread is not None and self.thread.is_alive() and not self.stop_evt.is_set()
+
+    def is_open(self):
+        """True selama capture thread berjalan dengan device yang sudah terbuka."""
+        return self.cap is not None and self.thread is not None and self.thread.is_alive()
+
     def get_latest_jpeg(self):
-        with self.frame_lock:
-            return self.latest_jpeg
+        return self.latest_jpeg
+
+    def get_latest_bgr(self):
+        """Frame BGR terbaru sebagai ndarray read-only (referensi, tanpa copy), atau None.
+
+        Hanya terisi selama ada konsumen terdaftar (add_bgr_consumer / bgr_consumer()): frame
+        dipublish apa adanya dan di-encode hanya kalau ada konsumen JPEG. Di mode passthrough
+        MJPG tidak ada frame BGR, jadi JPEG terbaru di-decode (np.frombuffer tanpa copy)
+        sekali per frame.
+        """
+        frame = self.latest_bgr
+        if frame is not None:
+            return frame
+        jpg = self.latest_jpeg
+        if jpg is None:
+            return None
+        src, decoded = self._bgr_memo
+        if src is not jpg:
+            decoded = cv2.imdecode(np.frombuffer(jpg, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if decoded is not None:
+                decoded.flags.writeable = False
+            self._bgr_memo = (jpg, decoded)
+        return decoded
+
+    def wait_for_frame(self, last_seq=0, timeout=1.0):
+        """Block sampai ada frame dengan seq != last_seq. Return (seq, jpeg) atau (last_seq, None)."""
+        with self.frame_cond:
+            ready = self.frame_cond.wait_for(
+                lambda: self.latest_jpeg is not None and self._seq != last_seq,
+                timeout=timeout,
+            )
+            if not ready:
+                return last_seq, None
+            return self._seq, self.latest_jpeg
 
 
 @bp_camera_stream.route("/camera/<int:index>.mjpg")
 def stream_mjpeg(index: int):
     """
     Stream MJPEG untuk camera <index>.
-    Query param opsional: ?w=640&h=480&fps=15&q=85
+    Query param opsional: ?w=640&h=480&fps=15&q=85&raw=1&fastdct=1
+    raw=0 mematikan passthrough MJPG (frame selalu di-decode lalu di-encode ulang dengan q).
     """
     from flask import request
 
@@ -103,27 +487,29 @@ def stream_mjpeg(index: int):
     height = int(request.args.get("h", 480))
     fps = float(request.args.get("fps", 15))
     q = int(request.args.get("q", 85))
+    raw = request.args.get("raw", "1") not in ("0", "false")
+    fast_dct = request.args.get("fastdct", "1") not in ("0", "false")
 
     cam = _SharedCamera(index=index, width=width, height=height, backend=None)
-    cam.start(fps=fps, jpeg_quality=q)
+    cam.start(fps=fps, jpeg_quality=q, passthrough_mjpg=raw, fast_dct=fast_dct)
 
-    boundary = "frame"
+    boundary = MJPEG_BOUNDARY
     def gen():
-        # tunggu frame pertama
-        deadline = time.time() + 3.0
-        while cam.get_latest_jpeg() is None and time.time() < deadline:
-            time.sleep(0.03)
-        while True:
-            jpg = cam.get_latest_jpeg()
-            if jpg is None:
-                time.sleep(0.01)
-                continue
-            yield (b"--" + boundary.encode() + b"\r\n"
-                   b"Content-Type: image/jpeg\r\n"
-                   b"Content-Length: " + str(len(jpg)).encode() + b"\r\n\r\n" +
-                   jpg + b"\r\n")
-    
-    response = Response(gen(), mimetype=f"multipart/x-mixed-replace; boundary={boundary}")
+        # tunggu frame baru dari capture thread (tanpa polling)
+        last_seq = -1
+        with cam.client():
+            while True:
+                seq, jpg = cam.wait_for_frame(last_seq, timeout=1.0)
+                if jpg is None:
+                    continue
+                last_seq = seq
+                yield b"".join((MJPEG_PART_PREFIX, b"%d" % len(jpg), MJPEG_PART_SEP, jpg, MJPEG_PART_TAIL))
+
+    response = Response(
+        stream_with_context(gen()),
+        mimetype=f"multipart/x-mixed-replace; boundary={boundary}",
+        direct_passthrough=True,
+    )
     response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
     response.headers['Pragma'] = 'no-cache'
     response.headers['Expires'] = '0'
@@ -1,6 +1,8 @@
 import eventlet
 
-eventlet.monkey_patch(all=False, socket=True)
+# select too: blocking clients that wait with select.select() (e.g. pymodbus' ModbusTcpClient)
+# then yield to other greenthreads instead of blocking the whole hub for each round trip
+eventlet.monkey_patch(all=False, socket=True, select=True)
 
 from flask_socketio import SocketIO
 from .flask_app import create_app
@@ -1,7 +1,9 @@
 import eventlet
 from ..env_config import is_set_app_config_on_ui_enabled
 
-eventlet.monkey_patch(all=False, socket=True)
+# select too: blocking clients that wait with select.select() (e.g. pymodbus' ModbusTcpClient)
+# then yield to other greenthreads instead of blocking the whole hub for each round trip
+eventlet.monkey_patch(all=False, socket=True, select=True)
 
 from app.flask.socketio_init import flask_app
 from app.flask.socketio_init import socketio
@@ -1,9 +1,8 @@
-import cv2
-import base64
+import functools
 import logging
-import time
 import sys
 import threading
+from collections import deque
 from ..core.processor_type_name_utils import ProcessorType
 from .extension_processor import ContextAwareExtensionProcessor
 from ...context.processor_context import ProcessorContext
@@ -11,6 +10,29 @@ from ..model import Field, NodeConfig
 # Import shared camera untuk konsistensi
 from ....flask.routes_camera_stream import _SharedCamera
 
+try:
+    import pybase64 as base64  # SIMD base64, same API as the stdlib module
+except ImportError:
+    import base64
+
+JPEG_DATA_URI_PREFIX = "data:image/jpeg;base64,"
+# Placeholder images returned by the videoStream output when the camera cannot be used,
+# base64-encoded once at import instead of being kept as opaque literals
+_PLACEHOLDER_SVG = (
+    '<svg width="320" height="240" xmlns="http://www.w3.org/2000/svg">'
+    '<rect width="100%" height="100%" fill="#ccc"/>'
+    '<text x="50%" y="50%" font-family="Arial" font-size="14" fill="#999" '
+    'text-anchor="middle" dy=".3em">{}</text></svg>'
+)
+
+
+def _svg_data_uri(svg):
+    return "data:image/svg+xml;base64," + base64.b64encode(svg.encode()).decode("ascii")
+
+
+SVG_CAMERA_NOT_AVAILABLE = _svg_data_uri(_PLACEHOLDER_SVG.format("Camera Not Available"))
+SVG_CAMERA_ERROR = _svg_data_uri(_PLACEHOLDER_SVG.format("Camera Error"))
+
 
 class CameraInputProcessor(ContextAwareExtensionProcessor):
     """
@@ -25,13 +47,6 @@ class CameraInputProcessor(ContextAwareExtensionProcessor):
     """
     processor_type = ProcessorType.CAMERA_INPUT.value
 
-    # Shared runtime state (per instance)
-    _shared_cam = None
-    _stream_thread = None
-    _stop_event = None
-    _latest_b64 = None
-    _lock = None
-
     def __init__(self, config, context: ProcessorContext):
         super().__init__(config, context)
         
@@ -66,6 +81,9 @@ class CameraInputProcessor(ContextAwareExtensionProcessor):
         self.target_fps = safe_float(config.get("target_fps", 15), 15.0)
         self.init_timeout_ms = safe_int(config.get("init_timeout_ms", 1500), 1500)  # tunggu frame pertama
         self.output_type = config.get("output_type", "videoStream")  # default to video stream
+        self.passthrough_mjpg = config.get("passthrough_mjpg", True) not in (False, 0, "0", "false")
+        # Fast integer DCT by default while streaming; single shots default to the accurate DCT
+        self.fast_dct = config.get("fast_dct", self.stream_mode == 1) not in (False, 0, "0", "false")
 
         # Validate ranges
         self.resolution_width = max(160, min(1920, self.resolution_width))
@@ -73,13 +91,13 @@ class CameraInputProcessor(ContextAwareExtensionProcessor):
         self.jpeg_quality = max(1, min(100, self.jpeg_quality))
         self.target_fps = max(1.0, min(60.0, self.target_fps))
 
-        # Internals
-        if self._lock is None:
-            self._lock = threading.Lock()
-        
-        if self._stop_event is None:
-            self._stop_event = threading.Event()
-        
+        # Runtime state, always per instance so independent cameras never share it
+        self._streaming = False
+        self._frame_listener = self._on_new_frame  # one bound method, so it can be removed again
+        self._latest = deque(maxlen=1)  # JPEG bytes terbaru dari shared camera
+        self._frame_event = threading.Event()  # di-set saat _latest pertama kali terisi
+        self._b64_memo = (None, None)  # (JPEG bytes, base64 bytes) terakhir yang di-encode
+
         # Initialize shared camera
         self._shared_cam = _SharedCamera(
             index=self.camera_index,
@@ -88,79 +106,63 @@ class CameraInputProcessor(ContextAwareExtensionProcessor):
             backend=None
         )
 
+        # Output type and stream mode are fixed per node: bind the matching path once
+        self.process = self._select_process()
+
     # ---------------- Helpers ----------------
 
-    def _encode_frame_to_base64(self, frame):
-        """Convert frame to base64 with proper data URI format"""
-        ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
-        if not ok:
-            raise Exception("Failed to encode image to JPEG")
-        base64_data = base64.b64encode(buf).decode("utf-8")
-        # Return with proper data URI format for imageBase64 output type
-        return f"data:image/jpeg;base64,{base64_data}"
-
-    def _stream_loop(self):
-        """Background thread untuk streaming mode dengan shared camera"""
-        logging.info("[CameraInput] Stream thread started")
-        frame_interval = 1.0 / max(1.0, self.target_fps)
-        consecutive_failures = 0
-        max_failures = 10
-        
+    def _get_latest_b64(self):
+        """Base64 of the latest JPEG, encoded on demand and memoized per frame object"""
         try:
-            # Start shared camera
-            self._shared_cam.start(fps=self.target_fps, jpeg_quality=self.jpeg_quality)
-            
-            while not self._stop_event.is_set():
-                try:
-                    # Get latest JPEG from shared camera
-                    jpeg_bytes = self._shared_cam.get_latest_jpeg()
-                    
-                    if jpeg_bytes is not None:
-                        # Convert JPEG bytes to base64 with data URI format
-                        base64_data = base64.b64encode(jpeg_bytes).decode("utf-8")
-                        b64_with_uri = f"data:image/jpeg;base64,{base64_data}"
-                        with self._lock:
-                            self._latest_b64 = b64_with_uri
-                        consecutive_failures = 0
-                    else:
-                        consecutive_failures += 1
-                        if consecutive_failures >= max_failures:
-                            logging.error("[CameraInput] Too many consecutive failures, stopping stream")
-                            break
-                        
-                except Exception as e:
-                    logging.error(f"[CameraInput] Stream thread error: {e}")
-                    consecutive_failures += 1
-                    if consecutive_failures >= max_failures:
-                        logging.error("[CameraInput] Too many exceptions, stopping stream")
-                        break
-                
-                time.sleep(frame_interval)
-                
-        except Exception as e:
-            logging.error(f"[CameraInput] Stream thread error: {e}")
-        finally:
-            logging.info("[CameraInput] Stream thread exiting")
+            jpeg_bytes = self._latest[-1]
+        except IndexError:
+            return None
+        src, b64 = self._b64_memo
+        if src is not jpeg_bytes:
+            b64 = base64.b64encode(jpeg_bytes)
+            self._b64_memo = (jpeg_bytes, b64)
+        return b64
+
+    @staticmethod
+    def _to_data_uri(b64):
+        """Build the imageBase64 data URI from base64 bytes, only at the hand-off point"""
+        return JPEG_DATA_URI_PREFIX + b64.decode("ascii")
+
+    def _on_new_frame(self, jpeg_bytes):
+        """Frame listener, called on every publish (capture thread or shared encode worker)"""
+        # Only keep the JPEG reference (atomic append, no lock); base64 is produced lazily
+        # by process() for the frames that are actually returned
+        self._latest.append(jpeg_bytes)
+        self._frame_event.set()
+
+    def get_latest_jpeg(self):
+        """Latest raw JPEG bytes received by the frame listener (None before the first frame)"""
+        try:
+            return self._latest[-1]
+        except IndexError:
+            return None
 
     def _start_stream_if_needed(self):
-        if self._stream_thread and self._stream_thread.is_alive():
+        # (Re)start is a no-op while the capture thread runs, and revives it after a stop()
+        self._shared_cam.start(fps=self.target_fps, jpeg_quality=self.jpeg_quality,
+                               passthrough_mjpg=self.passthrough_mjpg, fast_dct=self.fast_dct,
+                               warmup_ms=self.warmup_ms)
+        if self._streaming:
             return
         
-        logging.info("[CameraInput] Starting stream thread...")
-        self._stop_event.clear()
-        self._stream_thread = threading.Thread(target=self._stream_loop, daemon=True)
-        self._stream_thread.start()
+        logging.info("[CameraInput] Subscribing to shared camera frames...")
+        # Register as a consumer so frames get encoded, then receive each one as it is published
+        self._shared_cam.add_client()
+        self._shared_cam.add_listener(self._frame_listener)
+        self._streaming = True
 
     def _stop_stream(self):
-        logging.info("[CameraInput] Stopping stream thread...")
-        self._stop_event.set()
-        
-        if self._stream_thread:
-            self._stream_thread.join(timeout=1.5)
-            if self._stream_thread.is_alive():
-                logging.warning("[CameraInput] Stream thread did not stop gracefully")
-        
-        self._stream_thread = None
+        if not self._streaming:
+            return
+        logging.info("[CameraInput] Unsubscribing from shared camera frames...")
+        self._shared_cam.remove_listener(self._frame_listener)
+        self._shared_cam.remove_client()
+        self._streaming = False
 
     def _release_camera(self):
         # Stop shared camera if no other users
@@ -176,96 +178,94 @@ class CameraInputProcessor(ContextAwareExtensionProcessor):
           - For imageBase64 output: return single base64 image
         Single mode:
           - Capture once and return
+
+        __init__ binds self.process directly to the matching _process_* method, so this
+        dispatch only runs when process is looked up on the class.
         """
-        # For videoStream output, return MJPEG stream URL for real-time streaming
+        return self._select_process()()
+
+    def _select_process(self):
         if self.output_type == "videoStream":
-            logging.info("[CameraInput] videoStream mode - returning MJPEG stream URL")
+            return self._process_video_stream
+        if self.stream_mode == 1:
+            return self._process_b64_stream
+        return self._process_single_shot
+
+    def _stream_url(self):
+        return (f"http://localhost:5001/camera/{self.camera_index}.mjpg?w={self.resolution_width}"
+                f"&h={self.resolution_height}&fps={self.target_fps}&q={self.jpeg_quality}"
+                f"&raw={int(self.passthrough_mjpg)}&fastdct={int(self.fast_dct)}")
+
+    def _process_video_stream(self):
+        """Return the MJPEG stream URL for real-time streaming"""
+        logging.debug("[CameraInput] videoStream mode - returning MJPEG stream URL")
+        try:
+            # Ensure shared camera is started
+            self._shared_cam.start(fps=self.target_fps, jpeg_quality=self.jpeg_quality,
+                                   passthrough_mjpg=self.passthrough_mjpg, fast_dct=self.fast_dct,
+                                   warmup_ms=self.warmup_ms)
+            
+            # No first-frame wait or device probe: the MJPEG endpoint blocks on the shared
+            # camera's own frames, so the URL is usable as soon as the capture thread runs
+            if self._shared_cam.is_started():
+                stream_url = self._stream_url()
+                logging.debug("[CameraInput] Returning stream URL: %s", stream_url)
+                return [stream_url]
+            
+            logging.error("[CameraInput] Failed to access camera")
+            return [SVG_CAMERA_NOT_AVAILABLE]
+            
+        except Exception as e:
+            logging.error(f"[CameraInput] Error in videoStream mode: {e}")
+            return [SVG_CAMERA_ERROR]
+
+    def _process_b64_stream(self):
+        """Return the latest streamed frame as a base64 JPEG data URI"""
+        try:
+            logging.debug("[CameraInput] imageBase64 streaming mode")
+            self._start_stream_if_needed()
+    
+            # Wait for first frame up to init_timeout_ms
+            if self._frame_event.wait(timeout=self.init_timeout_ms / 1000.0):
+                latest_b64 = self._get_latest_b64()
+                if latest_b64 is not None:
+                    return [self._to_data_uri(latest_b64)]
+    
+            # Still no frame → try to get from shared camera directly
+            logging.info("[CameraInput] No frame yet; trying direct capture...")
             try:
-                # Ensure shared camera is started
-                self._shared_cam.start(fps=self.target_fps, jpeg_quality=self.jpeg_quality)
-                
-                # Wait for camera to be ready
-                deadline = time.time() + (self.init_timeout_ms / 1000.0)
-                while time.time() < deadline:
-                    jpeg_bytes = self._shared_cam.get_latest_jpeg()
-                    if jpeg_bytes:
-                        # Return MJPEG stream URL for real-time streaming
-                        stream_url = f"http://localhost:5001/camera/{self.camera_index}.mjpg?w={self.resolution_width}&h={self.resolution_height}&fps={self.target_fps}&q={self.jpeg_quality}"
-                        logging.info(f"[CameraInput] Returning stream URL: {stream_url}")
-                        return [stream_url]
-                    time.sleep(0.03)
-                
-                # Fallback: try direct capture to test camera
-                logging.warning("[CameraInput] No frame from shared camera, testing direct capture")
-                cap = cv2.VideoCapture(self.camera_index)
-                if cap.isOpened():
-                    ret, frame = cap.read()
-                    cap.release()
-                    if ret:
-                        # Camera works, return stream URL
-                        stream_url = f"http://localhost:5001/camera/{self.camera_index}.mjpg?w={self.resolution_width}&h={self.resolution_height}&fps={self.target_fps}&q={self.jpeg_quality}"
-                        return [stream_url]
-                
-                logging.error("[CameraInput] Failed to access camera")
-                return ["data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iMzIwIiBoZWlnaHQ9IjI0MCIgeG1sbnM9Imh0dHA6Ly93d3cudzMub3JnLzIwMDAvc3ZnIj48cmVjdCB3aWR0aD0iMTAwJSIgaGVpZ2h0PSIxMDAlIiBmaWxsPSIjY2NjIi8+PHRleHQgeD0iNTAlIiB5PSI1MCUiIGZvbnQtZmFtaWx5PSJBcmlhbCIgZm9udC1zaXplPSIxNCIgZmlsbD0iIzk5OSIgdGV4dC1hbmNob3I9Im1pZGRsZSIgZHk9Ii4zZW0iPkNhbWVyYSBOb3QgQXZhaWxhYmxlPC90ZXh0Pjwvc3ZnPg=="]
-                
+                self._shared_cam.start(fps=self.target_fps, jpeg_quality=self.jpeg_quality,
+                                       passthrough_mjpg=self.passthrough_mjpg, fast_dct=self.fast_dct,
+                                       warmup_ms=self.warmup_ms)
+                # Wait a bit for camera to initialize
+                _, jpeg_bytes = self._shared_cam.wait_for_frame(timeout=0.2)
+                if jpeg_bytes:
+                    self._latest.append(jpeg_bytes)
+                    self._frame_event.set()
+                    return [self._to_data_uri(self._get_latest_b64())]
+                else:
+                    raise Exception("No frame available from shared camera")
             except Exception as e:
-                logging.error(f"[CameraInput] Error in videoStream mode: {e}")
-                return ["data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iMzIwIiBoZWlnaHQ9IjI0MCIgeG1sbnM9Imh0dHA6Ly93d3cudzMub3JnLzIwMDAvc3ZnIj48cmVjdCB3aWR0aD0iMTAwJSIgaGVpZ2h0PSIxMDAlIiBmaWxsPSIjY2NjIi8+PHRleHQgeD0iNTAlIiB5PSI1MCUiIGZvbnQtZmFtaWx5PSJBcmlhbCIgZm9udC1zaXplPSIxNCIgZmlsbD0iIzk5OSIgdGV4dC1hbmNob3I9Im1pZGRsZSIgZHk9Ii4zZW0iPkNhbWVyYSBFcnJvcjwvdGV4dD48L3N2Zz4="]
+                raise Exception(f"Camera not ready: {e}")
         
+        except Exception as e:
+            logging.error(f"[CameraInput] Error: {e}")
+            raise
+
+    def _process_single_shot(self):
+        """Capture one frame using the shared camera and return it as a base64 JPEG data URI"""
         try:
-            # For imageBase64 output - single frame or streaming base64
-            if self.stream_mode == 1:
-                logging.info("[CameraInput] imageBase64 streaming mode")
-                self._start_stream_if_needed()
-        
-                # Wait for first frame up to init_timeout_ms
-                deadline = time.time() + (self.init_timeout_ms / 1000.0)
-                latest = None
-                while time.time() < deadline:
-                    with self._lock:
-                        latest = self._latest_b64
-                    if latest:
-                        return [latest]
-                    time.sleep(0.03)
-        
-                # Still no frame → try to get from shared camera directly
-                logging.info("[CameraInput] No frame yet; trying direct capture...")
-                try:
-                    self._shared_cam.start(fps=self.target_fps, jpeg_quality=self.jpeg_quality)
-                    # Wait a bit for camera to initialize
-                    time.sleep(0.2)
-                    jpeg_bytes = self._shared_cam.get_latest_jpeg()
-                    if jpeg_bytes:
-                        base64_data = base64.b64encode(jpeg_bytes).decode("utf-8")
-                        seed_b64 = f"data:image/jpeg;base64,{base64_data}"
-                        with self._lock:
-                            self._latest_b64 = seed_b64
-                        return [seed_b64]
-                    else:
-                        raise Exception("No frame available from shared camera")
-                except Exception as e:
-                    raise Exception(f"Camera not ready: {e}")
-            else:
-                # --- Single shot using shared camera ---
-                logging.info(f"[CameraInput] Single-shot mode using camera index={self.camera_index}")
-                try:
-                    self._shared_cam.start(fps=15, jpeg_quality=self.jpeg_quality)
-                    # Wait for camera to be ready
-                    deadline = time.time() + 2.0
-                    while time.time() < deadline:
-                        jpeg_bytes = self._shared_cam.get_latest_jpeg()
-                        if jpeg_bytes:
-                            base64_data = base64.b64encode(jpeg_bytes).decode("utf-8")
-                            b64 = f"data:image/jpeg;base64,{base64_data}"
-                            logging.info("[CameraInput] Single-shot capture successful")
-                            return [b64]
-                        time.sleep(0.05)
-                    
-                    raise Exception("Failed to capture frame in single-shot mode")
-                except Exception as e:
-                    logging.error(f"[CameraInput] Single-shot error: {e}")
-                    raise
+            logging.debug("[CameraInput] Single-shot mode using camera index=%s", self.camera_index)
+            self._shared_cam.start(fps=15, jpeg_quality=self.jpeg_quality,
+                                   passthrough_mjpg=self.passthrough_mjpg, fast_dct=self.fast_dct,
+                                   warmup_ms=self.warmup_ms)
+            # The first published frame is the shot; no separate open/verify/read round trip
+            with self._shared_cam.client():
+                _, jpeg_bytes = self._shared_cam.wait_for_frame(timeout=2.0)
+            if not jpeg_bytes:
+                raise Exception("Failed to capture frame in single-shot mode")
+            logging.debug("[CameraInput] Single-shot capture successful")
+            return [self._to_data_uri(base64.b64encode(jpeg_bytes))]
         
         except Exception as e:
             logging.error(f"[CameraInput] Error: {e}")
@@ -277,6 +277,12 @@ class CameraInputProcessor(ContextAwareExtensionProcessor):
         self._release_camera()
 
     def get_node_config(self):
+        # Static schema: built once per class (self may be the class itself when listing)
+        return self._schema()
+
+    @classmethod
+    @functools.cache
+    def _schema(cls):
         return NodeConfig(
             name="Camera Input",
             description="Capture images from camera with streaming support",
@@ -298,7 +304,7 @@ class CameraInputProcessor(ContextAwareExtensionProcessor):
                       description="Number of frame read attempts."),
                 Field(name="warmup_ms", label="⏱️ Camera Warmup Time (ms)", type="inputInt",
                       required=False, defaultValue=150,
-                      description="Camera warmup time in milliseconds."),
+                      description="Max camera warmup time in milliseconds (ends early once frames are not black)."),
                 Field(name="stream_mode", label="📺 Camera Stream Mode", type="select",
                       required=False, defaultValue=1,
                       options=[{"label": "📸 Single Shot", "value": 0},
@@ -315,6 +321,12 @@ class CameraInputProcessor(ContextAwareExtensionProcessor):
                       options=[{"label": "🎥 Live Video Stream (MJPEG)", "value": "videoStream"},
                                {"label": "🖼️ Static Base64 Image", "value": "imageBase64"}],
                       description="Choose between live video stream or base64 image output."),
+                Field(name="passthrough_mjpg", label="⚡ MJPG Passthrough", type="boolean",
+                      required=False, defaultValue=True,
+                      description="Forward the camera's own MJPG frames without decode/re-encode (JPEG quality is then ignored)."),
+                Field(name="fast_dct", label="⚡ Fast JPEG Encode", type="boolean",
+                      required=False, defaultValue=True,
+                      description="Use libjpeg-turbo's fast integer DCT with 4:2:0 chroma (slightly lower fidelity)."),
             ],
             # Use imageBase64 as default to avoid the black screen issue
             outputType="imageBase64",
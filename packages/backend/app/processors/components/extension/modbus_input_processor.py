@@ -1,9 +1,11 @@
-from pymodbus.client import ModbusTcpClient
-import json
+import functools
+import numpy as np
 from ..core.processor_type_name_utils import ProcessorType
 from .extension_processor import ContextAwareExtensionProcessor
 from ...context.processor_context import ProcessorContext
 from ..model import Field, NodeConfig
+from ....utils.processor_utils import dumps_json
+from ...utils.modbus_batch_scheduler import READ_METHODS, modbus_batch_scheduler
 
 
 class ModbusInputProcessor(ContextAwareExtensionProcessor):
@@ -15,47 +17,45 @@ class ModbusInputProcessor(ContextAwareExtensionProcessor):
         self.port = config.get("port", 502)
         self.unit_id = config.get("unit_id", 1)
         self.register_type = config.get("register_type", "holding")
+        if self.register_type not in READ_METHODS:
+            # Fail fast on a bad config instead of on every process() call
+            raise Exception(f"Unsupported register type: {self.register_type}")
         self.start_address = config.get("start_address", 0)
         self.count = config.get("count", 1)
+        self._dtype = np.uint16 if self.register_type in ("holding", "input") else bool
+        # Only "values" changes between polls: render the static fields once and keep the
+        # text up to the values placeholder (whatever separators the JSON backend uses)
+        template = dumps_json({
+            "host": self.host,
+            "port": self.port,
+            "unit_id": self.unit_id,
+            "register_type": self.register_type,
+            "start_address": self.start_address,
+            "count": self.count,
+            "values": None,
+        })
+        self._prefix = template[:-len("null}")]
 
     def process(self):
         """Read data from Modbus device"""
         try:
-            client = ModbusTcpClient(self.host, port=self.port)
-            client.connect()
+            # Reads of sibling nodes on the same device are merged into one request
+            values = modbus_batch_scheduler.read(self.host, self.port, self.unit_id, self.register_type,
+                                                 self.start_address, self.count)
             
-            if self.register_type == "holding":
-                result = client.read_holding_registers(self.start_address, self.count, slave=self.unit_id)
-            elif self.register_type == "input":
-                result = client.read_input_registers(self.start_address, self.count, slave=self.unit_id)
-            elif self.register_type == "coil":
-                result = client.read_coils(self.start_address, self.count, slave=self.unit_id)
-            elif self.register_type == "discrete":
-                result = client.read_discrete_inputs(self.start_address, self.count, slave=self.unit_id)
-            else:
-                raise Exception(f"Unsupported register type: {self.register_type}")
-            
-            client.close()
-            
-            if result.isError():
-                raise Exception(f"Modbus read error: {result}")
-            
-            data = {
-                "host": self.host,
-                "port": self.port,
-                "unit_id": self.unit_id,
-                "register_type": self.register_type,
-                "start_address": self.start_address,
-                "count": self.count,
-                "values": result.registers if hasattr(result, 'registers') else result.bits
-            }
-            
-            return json.dumps(data)
+            # Compact array (2 bytes per register / 1 per bit), serialized natively by dumps_json
+            return self._prefix + dumps_json(np.asarray(values, dtype=self._dtype)) + "}"
             
         except Exception as e:
             raise Exception(f"Modbus read error: {str(e)}")
 
     def get_node_config(self):
+        # Static schema: built once per class (self may be the class itself when listing)
+        return self._schema()
+
+    @classmethod
+    @functools.cache
+    def _schema(cls):
         host_field = Field(
             name="host",
             label="Host",
@@ -117,7 +117,7 @@ class ModbusInputProcessor(ContextAwareExtensionProcessor):
         )
 
         return NodeConfig(
-            processorType=self.processor_type,
+            processorType=cls.processor_type,
             nodeName="Modbus Input",
             icon="AiOutlineDatabase",
             section="input",
@@ -1,9 +1,15 @@
-from pymodbus.client import ModbusTcpClient
+import functools
 import json
+import sys
+import warnings
+from array import array
+import numpy as np
 from ..core.processor_type_name_utils import ProcessorType
 from .extension_processor import ContextAwareExtensionProcessor
 from ...context.processor_context import ProcessorContext
 from ..model import Field, NodeConfig
+from ....utils.processor_utils import dumps_json
+from ...utils.modbus_batch_scheduler import WRITE_METHODS, modbus_batch_scheduler
 
 
 class ModbusOutputProcessor(ContextAwareExtensionProcessor):
@@ -15,45 +21,66 @@ class ModbusOutputProcessor(ContextAwareExtensionProcessor):
         self.port = config.get("port", 502)
         self.unit_id = config.get("unit_id", 1)
         self.register_type = config.get("register_type", "holding")
+        if self.register_type not in WRITE_METHODS:
+            # Fail fast on a bad config instead of on every process() call
+            raise Exception(f"Unsupported register type for writing: {self.register_type}")
         self.start_address = config.get("start_address", 0)
         self.data_input = config.get("data_input", "")
+        self.only_changed = config.get("only_changed", False) not in (False, 0, "0", "false")
+
+    @classmethod
+    def _coerce_values(cls, raw):
+        """Turn the data input into a list of ints, parsing only when it arrives as text"""
+        if isinstance(raw, (list, tuple)):
+            # Structured input: no JSON round trip
+            return [int(v) for v in raw]
+        if isinstance(raw, dict) and 'values' in raw:
+            # Output of a Modbus Input node
+            return cls._coerce_values(raw['values'])
+        if isinstance(raw, (bytes, bytearray)):
+            # Raw register data, big-endian 16-bit words as on the Modbus wire
+            words = array('H', raw)
+            if sys.byteorder == 'little':
+                words.byteswap()
+            return words.tolist()
+        if isinstance(raw, str):
+            try:
+                data = json.loads(raw)
+            except ValueError:
+                # If not JSON, treat as comma-separated values
+                return cls._parse_csv(raw)
+            return cls._coerce_values(data)
+        return [int(raw)]
+
+    @staticmethod
+    def _parse_csv(raw):
+        """Comma-separated numbers -> ints (truncated like int(float(x)))"""
+        try:
+            # numpy's C parser; malformed input (e.g. empty fields) raises or warns
+            with warnings.catch_warnings():
+                warnings.simplefilter("error", DeprecationWarning)
+                values = np.fromstring(raw, dtype=np.float64, sep=',')
+        except (ValueError, DeprecationWarning):
+            values = None
+        # astype would silently turn nan/inf/out-of-range values into INT64_MIN: let the
+        # per-token parse handle (and reject) those, like the previous int(float(x))
+        if values is None or not (np.isfinite(values).all() and (np.abs(values) < 2.0 ** 63).all()):
+            return [int(float(x)) for x in raw.split(',') if x.strip()]
+        return values.astype(np.int64).tolist()
 
     def process(self):
         """Write data to Modbus device"""
         try:
             # Parse input data
-            if isinstance(self.data_input, str):
-                try:
-                    data = json.loads(self.data_input)
-                    if isinstance(data, dict) and 'values' in data:
-                        values = data['values']
-                    else:
-                        values = data if isinstance(data, list) else [data]
-                except:
-                    # If not JSON, treat as comma-separated values
-                    values = [int(float(x.strip())) for x in self.data_input.split(',') if x.strip()]
-            else:
-                values = self.data_input if isinstance(self.data_input, list) else [self.data_input]
+            values = self._coerce_values(self.data_input)
             
             if not values:
                 raise Exception("No data provided to write")
             
-            client = ModbusTcpClient(self.host, port=self.port)
-            client.connect()
-            
-            if self.register_type == "holding":
-                result = client.write_registers(self.start_address, values, slave=self.unit_id)
-            elif self.register_type == "coil":
-                # Convert to boolean values for coils
-                bool_values = [bool(v) for v in values]
-                result = client.write_coils(self.start_address, bool_values, slave=self.unit_id)
-            else:
-                raise Exception(f"Unsupported register type for writing: {self.register_type}")
-            
-            client.close()
-            
-            if result.isError():
-                raise Exception(f"Modbus write error: {result}")
+            # Convert to boolean values for coils
+            write_values = [bool(v) for v in values] if self.register_type == "coil" else values
+            sent = modbus_batch_scheduler.write(self.host, self.port, self.unit_id, self.register_type,
+                                                self.start_address, write_values, only_changed=self.only_changed)
             
             response = {
                 "success": True,
@@ -63,19 +90,26 @@ class ModbusOutputProcessor(ContextAwareExtensionProcessor):
                 "register_type": self.register_type,
                 "start_address": self.start_address,
                 "values_written": values,
-                "count": len(values)
+                "count": len(values),
+                "count_sent": sent
             }
             
-            return json.dumps(response)
+            return dumps_json(response)
             
         except Exception as e:
             error_response = {
                 "success": False,
                 "error": str(e)
             }
-            return json.dumps(error_response)
+            return dumps_json(error_response)
 
     def get_node_config(self):
+        # Static schema: built once per class (self may be the class itself when listing)
+        return self._schema()
+
+    @classmethod
+    @functools.cache
+    def _schema(cls):
         host_field = Field(
             name="host",
             label="Host",
@@ -134,14 +168,26 @@ class ModbusOutputProcessor(ContextAwareExtensionProcessor):
             description="Data to write to Modbus device (JSON array or comma-separated numbers)"
         )
 
+        only_changed_field = Field(
+            name="only_changed",
+            label="Only Write Changed Values",
+            type="boolean",
+            required=False,
+            defaultValue=False,
+            description="Skip values equal to the last ones written to the same registers. Only for registers "
+                        "this server writes exclusively (no other master or PLC logic); a full write is still sent "
+                        "every few seconds and after reconnects"
+        )
+
         return NodeConfig(
-            processorType=self.processor_type,
+            processorType=cls.processor_type,
             nodeName="Modbus Output",
             icon="AiOutlineExport",
             section="tools",
             outputType="text",
             defaultHideOutput=False,
-            fields=[host_field, port_field, unit_id_field, register_type_field, start_address_field, data_input_field]
+            fields=[host_field, port_field, unit_id_field, register_type_field, start_address_field, data_input_field,
+                    only_changed_field]
         )
 
     def cancel(self):
@@ -1,5 +1,13 @@
+import functools
 import logging
-import json
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+import cv2
+import numpy as np
+import torch
+from eventlet import tpool
+from eventlet.semaphore import Semaphore
 from ultralytics import YOLO
 from PIL import Image
 import requests
@@ -7,17 +15,240 @@ from io import BytesIO
 
 from ...context.processor_context import ProcessorContext
 from ..model import Field, NodeConfig, Option
+from ....utils.processor_utils import dumps_json
 from .extension_processor import ContextAwareExtensionProcessor
 
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB
+    _turbo = TurboJPEG()  # SIMD libjpeg-turbo decode, faster than PIL's JPEG plugin
+except Exception:  # package missing or libturbojpeg not found
+    _turbo = None
+
+# Shared session: keep-alive connections are reused across image fetches (no new TCP/TLS
+# handshake per detection on the same host)
+_HTTP = requests.Session()
+# Add proper headers to avoid blocking
+_HTTP.headers.update({
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+})
+_adapter = requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=2)
+_HTTP.mount('http://', _adapter)
+_HTTP.mount('https://', _adapter)
+
+# FP16 (tensor cores) whenever a CUDA device is present
+CUDA_AVAILABLE = torch.cuda.is_available()
+
+# Network input size and letterbox padding value (Ultralytics defaults)
+IMGSZ = 640
+PAD_VALUE = 114 / 255.0
+
+# Longest a request waits for the shared CUDA worker (queueing + inference), in seconds
+SUBMIT_TIMEOUT = 120
+
+# Leading bytes of the common image formats (JPEG, PNG, GIF, BMP, WebP/RIFF, TIFF)
+_IMAGE_SIGNATURES = (b"\xff\xd8\xff", b"\x89PNG\r\n\x1a\n", b"GIF87a", b"GIF89a", b"BM", b"RIFF",
+                     b"II*\x00", b"MM\x00*")
+
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _letterbox_chw(src, dst, scale_x, scale_y, pad_x, pad_y, new_w, new_h):
+        """Letterbox an (H,W,3) uint8 RGB image into a (3,S,S) float32 0-1 array in one pass.
+
+        Bilinear sampling with the same pixel-center mapping as cv2.INTER_LINEAR; scale_x/y are
+        source pixels per output pixel, the image occupies new_w x new_h at (pad_x, pad_y).
+        """
+        h, w = src.shape[0], src.shape[1]
+        out_h, out_w = dst.shape[1], dst.shape[2]
+        for y in prange(out_h):
+            iy = y - pad_y
+            if iy < 0 or iy >= new_h:
+                for x in range(out_w):
+                    for c in range(3):
+                        dst[c, y, x] = PAD_VALUE
+                continue
+            sy = min(max((iy + 0.5) * scale_y - 0.5, 0.0), h - 1.0)
+            y0 = int(sy)
+            y1 = min(y0 + 1, h - 1)
+            fy = sy - y0
+            for x in range(out_w):
+                ix = x - pad_x
+                if ix < 0 or ix >= new_w:
+                    for c in range(3):
+                        dst[c, y, x] = PAD_VALUE
+                    continue
+                sx = min(max((ix + 0.5) * scale_x - 0.5, 0.0), w - 1.0)
+                x0 = int(sx)
+                x1 = min(x0 + 1, w - 1)
+                fx = sx - x0
+                for c in range(3):
+                    top = src[y0, x0, c] * (1.0 - fx) + src[y0, x1, c] * fx
+                    bottom = src[y1, x0, c] * (1.0 - fx) + src[y1, x1, c] * fx
+                    dst[c, y, x] = (top * (1.0 - fy) + bottom * fy) / 255.0
+else:
+    _letterbox_chw = None
+
+
+class _YOLOWorker:
+    """
+    Long-lived CUDA inference thread shared by all YOLO nodes.
+
+    Inputs are (1,3,IMGSZ,IMGSZ) float32 CPU tensors. While the current input runs on the GPU,
+    the next queued one is copied into one of two pinned host buffers and uploaded on a
+    separate CUDA stream, so host->device copies overlap with inference.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._pinned = [torch.empty((1, 3, IMGSZ, IMGSZ), dtype=torch.float32).pin_memory() for _ in range(2)]
+        self._slot = 0
+        self._copy_stream = torch.cuda.Stream()
+        self._thread = threading.Thread(target=self._run, name="yolo-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, model, tensor, **predict_kwargs):
+        """Run model(tensor, **predict_kwargs) on the worker and return the results."""
+        future = Future()
+        self._queue.put((model, tensor, predict_kwargs, future))
+        # Wait in eventlet's native thread pool, so the hub keeps serving other greenthreads
+        try:
+            return tpool.execute(future.result, SUBMIT_TIMEOUT)
+        except FutureTimeoutError:
+            future.cancel()  # still queued: the worker skips it
+            raise Exception(f"YOLO inference did not finish within {SUBMIT_TIMEOUT} seconds")
+
+    def _stage(self, item):
+        """
+        Start the pinned host->device upload of a queued input on the copy stream. None when the
+        request was cancelled or the upload failed (the error is set on its future).
+        """
+        model, tensor, predict_kwargs, future = item
+        if not future.set_running_or_notify_cancel():
+            return None
+        try:
+            # The buffer's previous upload finished: its inference completed before this call
+            pinned = self._pinned[self._slot]
+            self._slot ^= 1
+            pinned.copy_(tensor)
+            with torch.cuda.stream(self._copy_stream):
+                gpu = pinned.to("cuda", non_blocking=True)
+                uploaded = torch.cuda.Event()
+                uploaded.record(self._copy_stream)
+        except Exception as e:  # e.g. CUDA out of memory: fail this request, keep the worker
+            future.set_exception(e)
+            return None
+        return model, gpu, predict_kwargs, future, uploaded
+
+    def _run(self):
+        staged = None
+        while True:
+            while staged is None:
+                staged = self._stage(self._queue.get())
+            model, gpu, predict_kwargs, future, uploaded = staged
+            staged = None
+            try:
+                torch.cuda.current_stream().wait_event(uploaded)
+                gpu.record_stream(torch.cuda.current_stream())
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            # Upload the next input (if any) while this one runs
+            try:
+                staged = self._stage(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            try:
+                future.set_result(model(gpu, **predict_kwargs))
+            except Exception as e:
+                future.set_exception(e)
+
 
 class YOLODetectionProcessor(ContextAwareExtensionProcessor):
     processor_type = "yolo-detection-processor"
+
+    # Loaded models shared by every instance (a new processor is created per flow run).
+    # Green semaphore: the first load may download weights over the patched socket.
+    _MODEL_CACHE = {}
+    _MODEL_LOCK = Semaphore()
+    _worker = None
     
     def __init__(self, config, context: ProcessorContext):
         super().__init__(config, context)
         self.model = None
+
+    @classmethod
+    def _get_model(cls, model_name, int8=False):
+        """Loaded model for model_name; with int8, its OpenVINO INT8 export (exported once)."""
+        key = (model_name, int8)
+        with cls._MODEL_LOCK:
+            model = cls._MODEL_CACHE.get(key)
+            if model is None:
+                logging.info(f"Loading YOLO model: {model_name}{' (OpenVINO INT8)' if int8 else ''}")
+                model = YOLO(model_name)
+                if int8:
+                    model = YOLO(model.export(format="openvino", int8=True), task="detect")
+                cls._MODEL_CACHE[key] = model
+            return model
+
+    @classmethod
+    def _get_worker(cls):
+        if cls._worker is None:
+            cls._worker = _YOLOWorker()
+        return cls._worker
+
+    @staticmethod
+    def _preprocess(image, fused=False):
+        """
+        Letterboxed (1,3,IMGSZ,IMGSZ) float32 RGB tensor for the image, plus (scale_x, scale_y, pad_x, pad_y)
+        to map boxes back to image coordinates. Ultralytics skips its own preprocessing for
+        tensor input. fused: use the numba kernel (must be available) instead of cv2.
+        """
+        src = np.asarray(image.convert("RGB"))
+        h, w = src.shape[:2]
+        r = min(IMGSZ / h, IMGSZ / w)
+        new_w, new_h = int(round(w * r)), int(round(h * r))
+        pad_x, pad_y = (IMGSZ - new_w) // 2, (IMGSZ - new_h) // 2
+        dst = np.empty((1, 3, IMGSZ, IMGSZ), dtype=np.float32)
+        scale_x, scale_y = w / new_w, h / new_h
+        if fused:
+            _letterbox_chw(src, dst[0], scale_x, scale_y, pad_x, pad_y, new_w, new_h)
+        else:
+            # The resize and border of Ultralytics' LetterBox, then HWC -> CHW 0-1
+            if (new_w, new_h) != (w, h):
+                src = cv2.resize(src, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+            padded = cv2.copyMakeBorder(src, pad_y, IMGSZ - new_h - pad_y, pad_x, IMGSZ - new_w - pad_x,
+                                        cv2.BORDER_CONSTANT, value=(114, 114, 114))
+            np.divide(padded.transpose(2, 0, 1), np.float32(255), out=dst[0])
+        return torch.from_numpy(dst), (scale_x, scale_y, pad_x, pad_y)
+
+    @staticmethod
+    def _scale_boxes(xyxy, letterbox, width, height):
+        """Letterboxed network xyxy boxes -> (clipped) coordinates in the width x height image"""
+        scale_x, scale_y, pad_x, pad_y = letterbox
+        xyxy = (xyxy - (pad_x, pad_y, pad_x, pad_y)) * (scale_x, scale_y, scale_x, scale_y)
+        return np.clip(xyxy, 0, (width, height, width, height), out=xyxy)
+
+    @staticmethod
+    def _predict_options(precision):
+        """(use the INT8 export, extra predict kwargs) for the precision setting"""
+        if CUDA_AVAILABLE:
+            if precision == "fp32":
+                return False, {"device": 0}
+            return False, {"device": 0, "half": True}
+        return precision == "int8", {}
     
     def get_node_config(self):
+        # Static schema: built once per class (self may be the class itself when listing)
+        return self._schema()
+
+    @classmethod
+    @functools.cache
+    def _schema(cls):
         image_url = Field(
             name="image_url",
             label="Image URL",
@@ -81,11 +312,40 @@ class YOLODetectionProcessor(ContextAwareExtensionProcessor):
             description="Filter detections to show only humans/persons",
         )
         
-        fields = [image_url, model_field, confidence, human_only]
+        precision = Field(
+            name="precision",
+            label="Inference Precision",
+            type="select",
+            options=[
+                Option(default=True, value="auto", label="Auto (FP16 on GPU, FP32 on CPU)"),
+                Option(default=False, value="fp32", label="FP32"),
+                Option(default=False, value="int8", label="INT8 on CPU (OpenVINO export)"),
+            ],
+            required=False,
+            description="INT8 exports the model with OpenVINO on first use (requires the openvino package)",
+        )
+        
+        validate = Field(
+            name="validate",
+            label="Validate Images",
+            type="boolean",
+            required=False,
+            description="Check the image format and fully decode it before detection (clearer errors for untrusted sources)",
+        )
+        
+        fused_preprocess = Field(
+            name="fused_preprocess",
+            label="Fused Preprocessing",
+            type="boolean",
+            required=False,
+            description="Letterbox images with a single-pass numba kernel instead of Ultralytics' cv2 preprocessing (requires numba)",
+        )
+        
+        fields = [image_url, model_field, confidence, human_only, precision, validate, fused_preprocess]
         
         config = NodeConfig(
             nodeName="YOLO Human Detection",
-            processorType=self.processor_type,
+            processorType=cls.processor_type,
             icon="EyeIcon",
             fields=fields,
             outputType="text",
@@ -96,15 +356,22 @@ class YOLODetectionProcessor(ContextAwareExtensionProcessor):
         
         return config
     
-    def load_image_from_url(self, url):
-        """Load image from URL or local path"""
+    @staticmethod
+    def _decode_jpeg(data):
+        """Decode JPEG bytes with libjpeg-turbo; None when unavailable or not a (supported) JPEG"""
+        if _turbo is None or data[:2] != b"\xff\xd8":
+            return None
+        try:
+            return Image.fromarray(_turbo.decode(data, pixel_format=TJPF_RGB))
+        except Exception:
+            return None  # e.g. CMYK/progressive edge cases: let PIL handle them
+
+    def load_image_from_url(self, url, validate=False):
+        """Load image from URL or local path (validate: check the format and decode eagerly)"""
         try:
+            content_type = ''
             if url.startswith('http'):
-                # Add proper headers to avoid blocking
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                }
-                response = requests.get(url, headers=headers, timeout=30)
+                response = _HTTP.get(url, timeout=30)
                 response.raise_for_status()
                 
                 # Check if content is actually an image
@@ -118,19 +385,25 @@ class YOLODetectionProcessor(ContextAwareExtensionProcessor):
                 if len(response.content) == 0:
                     raise Exception("Empty response content")
                     
-                image = Image.open(BytesIO(response.content))
+                data = response.content
             else:
                 # Handle local file path
-                image = Image.open(url)
+                with open(url, 'rb') as f:
+                    data = f.read()
             
-            # Verify image was loaded successfully
-            image.verify()
-            # Reopen image after verify (verify() closes the file)
-            if url.startswith('http'):
-                image = Image.open(BytesIO(response.content))
-            else:
-                image = Image.open(url)
-                
+            # O(1) magic-byte sniff instead of a full decode to reject e.g. HTML error pages
+            if validate and not data.startswith(_IMAGE_SIGNATURES) and not content_type.startswith('image/'):
+                raise Exception(f"Content is not a recognized image ({content_type or 'unknown type'})")
+            
+            image = self._decode_jpeg(data)
+            if image is not None:
+                return image
+            image = Image.open(BytesIO(data))
+            
+            if validate:
+                # Decode now so truncated/corrupt data fails here with a clear error; otherwise
+                # PIL decodes lazily, once, when the image is preprocessed for inference
+                image.load()
             return image
         except requests.exceptions.RequestException as e:
             raise Exception(f"Failed to fetch image from URL: {str(e)}")
@@ -147,22 +420,34 @@ class YOLODetectionProcessor(ContextAwareExtensionProcessor):
         # Handle boolean input properly
         human_only_input = self.get_input_by_name("human_only", "true")
         human_only = str(human_only_input).lower() in ['true', '1', 'yes', 'on']
+        int8, predict_options = self._predict_options(self.get_input_by_name("precision", "auto"))
+        validate = str(self.get_input_by_name("validate", "false")).lower() in ['true', '1', 'yes', 'on']
+        fused = _letterbox_chw is not None and \
+            str(self.get_input_by_name("fused_preprocess", "false")).lower() in ['true', '1', 'yes', 'on']
         
         if not image_url:
             raise Exception("Image URL is required")
         
         try:
-            # Load YOLO model
-            if not self.model or self.model.model_name != model_name:
-                logging.info(f"Loading YOLO model: {model_name}")
-                self.model = YOLO(model_name)
-                self.model.model_name = model_name
+            # Load YOLO model (warm after the first run with this model)
+            self.model = self._get_model(model_name, int8)
             
             # Load and process image
-            image = self.load_image_from_url(image_url)
+            image = self.load_image_from_url(image_url, validate)
             
-            # Run detection
-            results = self.model(image, conf=confidence)
+            # Run detection (the CUDA worker takes letterboxed tensors; on CPU the image goes to
+            # Ultralytics unless the fused kernel is enabled)
+            letterbox = None
+            if fused or CUDA_AVAILABLE:
+                tensor, letterbox = self._preprocess(image, fused)
+                if CUDA_AVAILABLE:
+                    # Shared CUDA worker: overlaps this upload with inference of other requests
+                    results = self._get_worker().submit(self.model, tensor, conf=confidence, verbose=False,
+                                                        **predict_options)
+                else:
+                    results = self.model(tensor, conf=confidence, verbose=False, **predict_options)
+            else:
+                results = self.model(image, conf=confidence, verbose=False, **predict_options)
             
             # Define human-related class names (COCO dataset classes)
             human_classes = ["person"]
@@ -172,24 +457,27 @@ class YOLODetectionProcessor(ContextAwareExtensionProcessor):
             for result in results:
                 boxes = result.boxes
                 if boxes is not None:
-                    for box in boxes:
-                        class_name = result.names[int(box.cls[0])]
+                    # One device->host copy per array instead of tensor indexing per box
+                    xyxy = boxes.xyxy.cpu().numpy()
+                    if letterbox is not None:
+                        # Letterboxed network coordinates -> original image coordinates
+                        xyxy = self._scale_boxes(xyxy, letterbox, image.width, image.height)
+                    xyxy = xyxy.tolist()
+                    conf = boxes.conf.cpu().numpy().tolist()
+                    cls = boxes.cls.cpu().numpy().astype(int).tolist()
+                    names = result.names
+                    for (x1, y1, x2, y2), score, class_id in zip(xyxy, conf, cls):
+                        class_name = names[class_id]
                         
                         # Filter for humans only if human_only is enabled
                         if human_only and class_name not in human_classes:
                             continue
                             
-                        detection = {
+                        detections.append({
                             "class": class_name,
-                            "confidence": float(box.conf[0]),
-                            "bbox": {
-                                "x1": float(box.xyxy[0][0]),
-                                "y1": float(box.xyxy[0][1]),
-                                "x2": float(box.xyxy[0][2]),
-                                "y2": float(box.xyxy[0][3]),
-                            }
-                        }
-                        detections.append(detection)
+                            "confidence": score,
+                            "bbox": {"x1": x1, "y1": y1, "x2": x2, "y2": y2},
+                        })
             
             # Format output with human-specific information
             human_count = len([d for d in detections if d["class"] == "person"])
@@ -205,7 +493,7 @@ class YOLODetectionProcessor(ContextAwareExtensionProcessor):
                 }
             }
             
-            return json.dumps(output, indent=2)
+            return dumps_json(output, indent=True)
             
         except Exception as e:
             logging.error(f"YOLO detection failed: {str(e)}")
@@ -0,0 +1,58 @@
+import logging
+import os
+import threading
+
+
+class StreamScheduler:
+    """
+    Shared worker threads for per-frame stream work (e.g. JPEG encoding), serving every
+    stream in the process instead of each stream starting its own threads.
+
+    Work is keyed per stream and only the latest submission matters: a stream that is
+    already queued is not queued again, its callback picks up the newest frame when it
+    runs. Streams are served in FIFO order, so one busy camera cannot starve the others.
+    """
+
+    def __init__(self, workers=1):
+        self.workers = max(1, workers)
+        self._cond = threading.Condition()
+        self._ready = {}  # key -> callback, insertion ordered (FIFO)
+        self._threads = []
+
+    def submit(self, key, callback):
+        """Queue callback() for key unless key is already waiting to run."""
+        with self._cond:
+            if key not in self._ready:
+                self._ready[key] = callback
+                self._cond.notify()
+            if not self._threads:
+                self._start()
+
+    def discard(self, key):
+        """Drop queued work for key (e.g. when its stream stops)."""
+        with self._cond:
+            self._ready.pop(key, None)
+
+    def _start(self):
+        self._threads = [
+            threading.Thread(target=self._run, name=f"stream-scheduler-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._ready)
+                key = next(iter(self._ready))
+                callback = self._ready.pop(key)
+            try:
+                callback()
+            except Exception as e:
+                logging.error("[StreamScheduler] task error: %s", e)
+
+
+# Two workers keep a single high-quality stream at full rate on multi-core machines
+# (encoders release the GIL); more streams share them instead of adding threads.
+stream_scheduler = StreamScheduler(workers=2 if (os.cpu_count() or 1) >= 4 else 1)
@@ -0,0 +1,178 @@
+import logging
+import time
+
+import eventlet
+from eventlet.event import Event
+
+from . import modbus_client_pool
+
+# register_type -> client method, for the types each direction supports
+READ_METHODS = {
+    "holding": "read_holding_registers",
+    "input": "read_input_registers",
+    "coil": "read_coils",
+    "discrete": "read_discrete_inputs",
+}
+# register_type -> response attribute carrying the values read
+RESULT_ATTRS = {"holding": "registers", "input": "registers", "coil": "bits", "discrete": "bits"}
+WRITE_METHODS = {
+    "holding": "write_registers",
+    "coil": "write_coils",
+}
+
+_NOT_WRITTEN = object()
+
+# Largest quantity a single Modbus read request may ask for
+MAX_READ_COUNT = {"holding": 125, "input": 125, "coil": 2000, "discrete": 2000}
+
+# Seconds before a device's last-written values are forgotten, forcing a full write
+WRITE_CACHE_TTL = 10.0
+
+
+class ModbusBatchScheduler:
+    """
+    Coalesces Modbus reads from nodes that run in the same launcher pass.
+
+    The launcher spawns every ready node as a greenthread before yielding, so the first read
+    for a (host, port, unit_id, register_type) yields once, letting sibling nodes register
+    their windows. Overlapping or adjacent windows (within gap_threshold addresses) are then
+    served by one read and each node gets its slice.
+
+    Writes can skip values that equal the last value written to the same address
+    (differential write), only sending the span that actually changed. This is only
+    correct for registers this process owns exclusively: a value changed by another
+    master, PLC logic or a device restart is not seen. To bound the damage, the
+    remembered values are dropped on any failed write, whenever the connection to the
+    device is re-established, and write_cache_ttl seconds after they were first recorded.
+    """
+
+    def __init__(self, gap_threshold=0, write_cache_ttl=WRITE_CACHE_TTL):
+        self.gap_threshold = gap_threshold
+        self.write_cache_ttl = write_cache_ttl
+        self._pending = {}  # key -> [(start, count, Event)] waiting for the leader's flush
+        # key -> (connection id, expiry, {address: value}) from successful writes
+        self._last_written = {}
+
+    def read(self, host, port, unit_id, register_type, start, count):
+        """Read count values from start and return them as a list (registers or bits)."""
+        if register_type not in READ_METHODS:
+            raise Exception(f"Unsupported register type: {register_type}")
+        key = (host, port, unit_id, register_type)
+        done = Event()
+        batch = self._pending.get(key)
+        if batch is not None:
+            batch.append((start, count, done))
+            return done.wait()
+
+        batch = self._pending[key] = [(start, count, done)]
+        try:
+            eventlet.sleep(0)  # let sibling greenthreads join the batch
+        finally:
+            del self._pending[key]
+        try:
+            self._flush(key, batch)
+        except Exception as e:
+            # Never leave sibling nodes waiting on a batch that will not be served
+            for _, _, waiter in batch:
+                if not waiter.ready():
+                    waiter.send_exception(e)
+        return done.wait()
+
+    def write(self, host, port, unit_id, register_type, start, values, only_changed=False):
+        """
+        Write values from start and return the number of values sent.
+
+        With only_changed, values equal to the last ones written to the same addresses are
+        skipped and only the span between the first and last changed value is sent (0 when
+        nothing changed).
+        """
+        method = WRITE_METHODS.get(register_type)
+        if method is None:
+            raise Exception(f"Unsupported register type for writing: {register_type}")
+        key = (host, port, unit_id, register_type)
+        written = self._written_values(key)
+        first, last = 0, len(values)
+        if only_changed:
+            changed = [i for i, v in enumerate(values) if written.get(start + i, _NOT_WRITTEN) != v]
+            if not changed:
+                return 0
+            first, last = changed[0], changed[-1] + 1
+        span = values[first:last]
+
+        try:
+            result = modbus_client_pool.run(
+                host, port, lambda client: getattr(client, method)(start + first, span, device_id=unit_id)
+            )
+            if result.isError():
+                raise Exception(f"Modbus write error: {result}")
+        except Exception:
+            # Unknown what reached the device: assume nothing about its registers
+            self._last_written.pop(key, None)
+            raise
+        # Reconnected during this write: only the span just sent is known
+        written = self._written_values(key)
+        written.update(zip(range(start + first, start + last), span))
+        return len(span)
+
+    def _written_values(self, key):
+        """{address: value} last written for key, reset on reconnect or after write_cache_ttl."""
+        connection = modbus_client_pool.connection_id(key[0], key[1])
+        entry = self._last_written.get(key)
+        if entry is None or entry[0] != connection or time.monotonic() >= entry[1]:
+            entry = self._last_written[key] = (connection, time.monotonic() + self.write_cache_ttl, {})
+        return entry[2]
+
+    def _flush(self, key, batch):
+        for group in self._merge(batch, MAX_READ_COUNT[key[3]]):
+            if len(group) == 1 or not self._read_merged(key, group):
+                for start, count, done in group:
+                    try:
+                        done.send(self._read_range(key, start, count))
+                    except Exception as e:
+                        done.send_exception(e)
+
+    def _merge(self, batch, limit):
+        """Group requests whose windows overlap or are within gap_threshold of each other."""
+        groups = []
+        group_start = group_end = None
+        for request in sorted(batch, key=lambda r: r[0]):
+            start, count, _ = request
+            end = start + count
+            if (groups and start <= group_end + self.gap_threshold
+                    and max(end, group_end) - group_start <= limit):
+                groups[-1].append(request)
+                group_end = max(end, group_end)
+            else:
+                groups.append([request])
+                group_start, group_end = start, end
+        return groups
+
+    def _read_merged(self, key, group):
+        """Serve the group with one read; False if it failed and requests must be read separately."""
+        start = group[0][0]
+        count = max(s + c for s, c, _ in group) - start
+        try:
+            values = self._read_range(key, start, count)
+        except Exception as e:
+            # A filler address between windows may not exist on the device
+            logging.debug(f"Merged Modbus read {key} {start}+{count} failed ({e}), reading separately")
+            return False
+        logging.debug(f"Merged {len(group)} Modbus reads {key} into {start}+{count}")
+        for s, c, done in group:
+            done.send(values[s - start:s - start + c])
+        return True
+
+    def _read_range(self, key, start, count):
+        host, port, unit_id, register_type = key
+        method, attr = READ_METHODS[register_type], RESULT_ATTRS[register_type]
+        result = modbus_client_pool.run(
+            host, port, lambda client: getattr(client, method)(start, count=count, device_id=unit_id)
+        )
+        if result.isError():
+            raise Exception(f"Modbus read error: {result}")
+        # Bit reads come back padded to a whole byte: always hand out exactly count values,
+        # so a node sees the same length whether or not its read was merged
+        return getattr(result, attr)[:count]
+
+
+modbus_batch_scheduler = ModbusBatchScheduler()
@@ -0,0 +1,91 @@
+import atexit
+import logging
+import threading
+
+from eventlet.semaphore import Semaphore
+from pymodbus.client import ModbusTcpClient
+from pymodbus.exceptions import ConnectionException
+
+
+# (host, port) -> (ModbusTcpClient, lock). One persistent socket per device, shared by every
+# Modbus node; the lock serializes transactions since the sync client is not thread-safe.
+# Nodes run as eventlet greenthreads and the (monkey-patched) socket yields while the lock
+# is held, so it must be a green Semaphore: a threading.Lock would block the whole hub.
+# _POOL_LOCK is never held across I/O, so a plain lock is fine there.
+_CLIENT_POOL = {}
+_POOL_LOCK = threading.Lock()
+# (host, port) -> number of connections established so far. Callers caching device state
+# compare it to notice a reconnect (the device may have restarted meanwhile).
+_CONNECTIONS = {}
+
+
+def _entry(host, port):
+    key = (host, port)
+    with _POOL_LOCK:
+        entry = _CLIENT_POOL.get(key)
+        if entry is None:
+            entry = (ModbusTcpClient(host, port=port), Semaphore())
+            _CLIENT_POOL[key] = entry
+        return entry
+
+
+def _ensure_connected(client, host, port):
+    if client.connected:
+        return
+    if not client.connect():
+        raise ConnectionException(f"Cannot connect to Modbus device {host}:{port}")
+    _CONNECTIONS[(host, port)] = _CONNECTIONS.get((host, port), 0) + 1
+
+
+def connection_id(host, port):
+    """Identifier of the current connection to (host, port); changes on every (re)connect."""
+    return _CONNECTIONS.get((host, port), 0)
+
+
+def _drop(key, entry):
+    with _POOL_LOCK:
+        if _CLIENT_POOL.get(key) is entry:
+            del _CLIENT_POOL[key]
+    client, lock = entry
+    with lock:
+        client.close()
+
+
+def evict(host, port):
+    """Close and forget the pooled client for (host, port)."""
+    key = (host, port)
+    entry = _CLIENT_POOL.get(key)
+    if entry is not None:
+        _drop(key, entry)
+
+
+def run(host, port, request):
+    """
+    Run request(client) on the pooled client for (host, port) and return its result.
+
+    A stale socket (ConnectionException) evicts the client and the request is retried
+    once on a fresh connection.
+    """
+    for attempt in range(2):
+        entry = _entry(host, port)
+        client, lock = entry
+        try:
+            with lock:
+                _ensure_connected(client, host, port)
+                return request(client)
+        except ConnectionException:
+            _drop((host, port), entry)
+            if attempt:
+                raise
+            logging.warning(f"Modbus connection to {host}:{port} lost, reconnecting")
+
+
+@atexit.register
+def close_all():
+    """Close every pooled client."""
+    with _POOL_LOCK:
+        entries = list(_CLIENT_POOL.values())
+        _CLIENT_POOL.clear()
+    for client, lock in entries:
+        with lock:
+            client.close()
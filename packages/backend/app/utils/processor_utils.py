@@ -1,9 +1,15 @@
 from datetime import datetime
+import json
 import os
 import tempfile
 from urllib.parse import urlparse
 import requests
 
+try:
+    import orjson  # C JSON encoder, much faster on lists of numbers
+except ImportError:
+    orjson = None
+
 
 def create_empty_tmp_file(prefix="tmp"):
     temp_dir = tempfile.TemporaryDirectory()
@@ -12,6 +18,22 @@ def create_empty_tmp_file(prefix="tmp"):
     return temp_file, temp_dir
 
 
+def _json_default(obj):
+    # numpy arrays/scalars for the stdlib fallback (orjson serializes them natively)
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps_json(obj, indent=False):
+    """Serialize obj (may contain numpy arrays) to a JSON str, with orjson when available
+    (indent=True for 2 spaces)."""
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, option=option).decode()
+    return json.dumps(obj, indent=2 if indent else None, default=_json_default)
+
+
 def create_temp_file_with_str_content(content):
     temp_file, temp_dir = create_empty_tmp_file()
     with open(temp_file, "w") as f:
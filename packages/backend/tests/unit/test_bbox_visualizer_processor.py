@@ -0,0 +1,106 @@
+import colorsys
+import unittest
+from io import BytesIO
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from app.processors.components.extension import bbox_visualizer_processor
+from app.processors.components.extension.bbox_visualizer_processor import (
+    BboxVisualizerProcessor,
+)
+
+# (x1, y1, x2, y2), thickness; includes boxes reaching past the image edges
+BOXES = [
+    ((10, 10, 40, 30), 3),
+    ((-5, -5, 20, 20), 3),
+    ((50, 40, 70, 60), 1),
+    ((30, 5, 63, 47), 4),
+]
+
+
+class TestBboxVisualizerProcessor(unittest.TestCase):
+    def setUp(self):
+        self.processor = BboxVisualizerProcessor(
+            {"name": "bbox", "processorType": BboxVisualizerProcessor.processor_type}, None
+        )
+
+    def test_draw_box_matches_pil_outline(self):
+        for (x1, y1, x2, y2), thickness in BOXES:
+            arr = np.zeros((48, 64, 3), dtype=np.uint8)
+            BboxVisualizerProcessor._draw_box(arr, x1, y1, x2, y2, (255, 0, 0), thickness)
+
+            expected = Image.new("RGB", (64, 48))
+            half = thickness - 1
+            ImageDraw.Draw(expected).rectangle(
+                [x1 - half, y1 - half, x2 + half, y2 + half], outline=(255, 0, 0), width=thickness
+            )
+            np.testing.assert_array_equal(arr, np.asarray(expected))
+
+    def test_non_positive_thickness_draws_no_border(self):
+        for thickness in (0, -3):
+            arr = np.zeros((48, 64, 3), dtype=np.uint8)
+            BboxVisualizerProcessor._draw_box(arr, 10, 10, 40, 30, (255, 0, 0), thickness)
+            self.assertFalse(arr.any())
+
+    def test_draw_bounding_boxes_leaves_source_untouched(self):
+        image = Image.new("RGB", (64, 48))
+        boxes = np.array([box for box, _ in BOXES], dtype=np.int32)
+        result = self.processor.draw_bounding_boxes(
+            image, boxes, ["person"] * len(boxes),
+            np.ones(len(boxes), dtype=np.float32), show_labels=False,
+        )
+        self.assertFalse(np.asarray(image).any())
+        self.assertTrue(np.asarray(result).any())
+
+    @unittest.skipIf(bbox_visualizer_processor._rasterize_boxes is None, "numba not installed")
+    def test_rasterize_boxes_matches_sequential_draw(self):
+        rng = np.random.default_rng(0)
+        boxes = rng.integers(-20, 120, (300, 4)).astype(np.int32)
+        boxes[:, 2:] = boxes[:, :2] + rng.integers(-5, 60, (300, 2))
+        colors = rng.integers(0, 256, (300, 3)).astype(np.uint8)
+        for thickness in (-2, 0, 1, 3, 5):
+            arr = np.zeros((96, 128, 3), dtype=np.uint8)
+            bbox_visualizer_processor._rasterize_boxes(arr, boxes, colors, thickness)
+
+            # Overlapping boxes must resolve in draw order, as with one-by-one drawing
+            expected = np.zeros_like(arr)
+            for box, color in zip(boxes.tolist(), colors.tolist()):
+                BboxVisualizerProcessor._draw_box(expected, *box, tuple(color), thickness)
+            np.testing.assert_array_equal(arr, expected)
+
+    def test_generate_colors_matches_colorsys(self):
+        for num_colors in (1, 2, 3, 7, 80, 1000):
+            expected = tuple(
+                tuple(int(c * 255) for c in colorsys.hsv_to_rgb(i / num_colors, 0.8, 0.9))
+                for i in range(num_colors)
+            )
+            self.assertEqual(bbox_visualizer_processor._generate_colors(num_colors), expected)
+
+    def _mock_response(self, body, headers):
+        response = MagicMock()
+        response.__enter__.return_value = response
+        response.headers = headers
+        response.iter_content.return_value = [body[i:i + 1024] for i in range(0, len(body), 1024)]
+        return response
+
+    def test_load_image_from_url_caps_chunked_responses(self):
+        buffer = BytesIO()
+        Image.new("RGB", (64, 48)).save(buffer, format="PNG")
+        body = buffer.getvalue()
+        # Chunked response: no Content-Length, the cap applies while reading
+        response = self._mock_response(body, {"content-type": "image/png"})
+        with patch.object(bbox_visualizer_processor.requests, "get", return_value=response), \
+                patch.object(bbox_visualizer_processor, "MAX_IMAGE_BYTES", len(body) - 1):
+            with self.assertRaisesRegex(Exception, "too large"):
+                self.processor.load_image_from_url("http://camera.local/frame.png")
+
+        response = self._mock_response(body, {"content-type": "image/png"})
+        with patch.object(bbox_visualizer_processor.requests, "get", return_value=response):
+            image = self.processor.load_image_from_url("http://camera.local/frame.png")
+        self.assertEqual(image.size, (64, 48))
+
+
+if __name__ == "__main__":
+    unittest.main()
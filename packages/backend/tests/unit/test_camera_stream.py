@@ -0,0 +1,90 @@
+import time
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from app.flask.routes_camera_stream import _SharedCamera
+
+
+class FakeCapture:
+    """VideoCapture stand-in producing small BGR frames whose value changes every read."""
+
+    def __init__(self):
+        self.reads = 0
+
+    def get(self, prop):
+        return 30
+
+    def set(self, prop, value):
+        return True
+
+    def grab(self):
+        return True
+
+    def read(self, buf=None):
+        self.reads += 1
+        return True, np.full((48, 64, 3), self.reads % 256, dtype=np.uint8)
+
+    def release(self):
+        pass
+
+
+def fake_open(camera):
+    camera.cap = FakeCapture()
+    camera.small_buffer = True
+    camera.raw_mjpeg = False
+
+
+class TestSharedCamera(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.object(_SharedCamera, "_open", fake_open)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cam = _SharedCamera(index=99, width=64, height=48)
+        self.cam.start(fps=50)
+        self.addCleanup(self.cam.stop)
+
+    def test_idle_camera_drops_cached_jpeg(self):
+        with self.cam.client():
+            seq, jpeg = self.cam.wait_for_frame(timeout=2.0)
+            self.assertIsNotNone(jpeg)
+
+        deadline = time.monotonic() + 2.0
+        while self.cam.latest_jpeg is not None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertIsNone(self.cam.latest_jpeg)
+
+        # A new consumer gets a frame captured after it registered, not the old one
+        with self.cam.client():
+            new_seq, new_jpeg = self.cam.wait_for_frame(timeout=2.0)
+        self.assertIsNotNone(new_jpeg)
+        self.assertGreater(new_seq, seq)
+
+    def test_bgr_frames_only_kept_while_registered(self):
+        # Reading the frame does not register a consumer: the camera stays idle
+        self.assertIsNone(self.cam.get_latest_bgr())
+        self.assertEqual(self.cam.bgr_consumers, 0)
+
+        with self.cam.bgr_consumer():
+            deadline = time.monotonic() + 2.0
+            while self.cam.get_latest_bgr() is None and time.monotonic() < deadline:
+                time.sleep(0.01)
+            frame = self.cam.get_latest_bgr()
+            self.assertIsNotNone(frame)
+            self.assertFalse(frame.flags.writeable)
+            # BGR-only consumers do not trigger JPEG encoding
+            self.assertIsNone(self.cam.latest_jpeg)
+
+        self.assertEqual(self.cam.bgr_consumers, 0)
+        self.assertIsNone(self.cam.get_latest_bgr())
+
+    def test_stop_drops_cached_jpeg(self):
+        with self.cam.client():
+            self.cam.wait_for_frame(timeout=2.0)
+        self.cam.stop()
+        self.assertIsNone(self.cam.latest_jpeg)
+
+
+if __name__ == "__main__":
+    unittest.main()
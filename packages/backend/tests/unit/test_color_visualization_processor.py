@@ -0,0 +1,49 @@
+import unittest
+
+import numpy as np
+
+from app.processors.components.extension.color_visualization_processor import (
+    ColorVisualizationProcessor,
+    _parse_data_input,
+)
+
+
+def make_processor(data_input, visualization_type="heatmap"):
+    config = {
+        "name": "colors",
+        "processorType": ColorVisualizationProcessor.processor_type,
+        "data_input": data_input,
+        "visualization_type": visualization_type,
+        "width": 80,
+        "height": 40,
+        "output_format": "png",
+    }
+    return ColorVisualizationProcessor(config, None)
+
+
+class TestColorVisualizationProcessor(unittest.TestCase):
+    def test_parsed_input_is_immutable(self):
+        data = _parse_data_input("[[1, 2], [3, 4]]")
+        self.assertEqual(data, ((1, 2), (3, 4)))
+        with self.assertRaises(TypeError):
+            data[0] = (9, 9)
+
+        values = _parse_data_input("1, 2.5, 3")
+        np.testing.assert_array_equal(values, [1.0, 2.5, 3.0])
+        with self.assertRaises(ValueError):
+            values[0] = 9
+
+    def test_cached_input_renders_like_raw_lists(self):
+        cases = {
+            "heatmap": [[1, 2], [3, 4]],
+            "bar_chart": [1, 5, 3, 2],
+            "color_gradient": [1, 5, 3, 2],
+        }
+        for visualization_type, data in cases.items():
+            parsed = make_processor(str(data), visualization_type)
+            raw = make_processor(data, visualization_type)
+            self.assertEqual(parsed.process(), raw.process())
+
+
+if __name__ == "__main__":
+    unittest.main()
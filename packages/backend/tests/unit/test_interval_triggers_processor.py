@@ -0,0 +1,35 @@
+import itertools
+import unittest
+from unittest.mock import patch
+
+from app.processors.components.extension import interval_triggers_processor
+from app.processors.components.extension.interval_triggers_processor import (
+    IntervalTriggerProcessor,
+)
+
+
+def make_processor(name):
+    return IntervalTriggerProcessor(
+        {"name": name, "processorType": IntervalTriggerProcessor.processor_type}, None
+    )
+
+
+class TestIntervalTriggerProcessor(unittest.TestCase):
+    def test_ticks_are_unique_across_runs_and_nodes(self):
+        ticks = [make_processor(name).process()[0] for name in ("a", "b", "a", "b")]
+        self.assertEqual(len(set(ticks)), len(ticks))
+        for tick in ticks:
+            self.assertTrue(tick.startswith(interval_triggers_processor._TICK_PREFIX))
+
+    def test_ticks_differ_across_process_restarts(self):
+        self.assertRegex(interval_triggers_processor._TICK_PREFIX, r"^tick_\d+_$")
+        # Each process start gets a fresh counter and a prefix from its start time
+        ticks = []
+        for prefix in ("tick_1000_", "tick_2000_"):
+            with patch.object(interval_triggers_processor, "_TICK_PREFIX", prefix), \
+                    patch.object(interval_triggers_processor, "_TICKS", itertools.count(1)):
+                ticks.append(make_processor("a").process()[0])
+        self.assertEqual(ticks, ["tick_1000_1", "tick_2000_1"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import unittest
+from unittest.mock import create_autospec, patch
+
+import eventlet
+from pymodbus.client import ModbusTcpClient
+
+from app.processors.utils import modbus_batch_scheduler
+from app.processors.utils.modbus_batch_scheduler import ModbusBatchScheduler
+
+
+class FakeResult:
+    def __init__(self, values, error=False):
+        self.registers = values
+        # Like pymodbus, bits are padded to a multiple of 8
+        self.bits = [bool(v % 2) for v in values] + [False] * (-len(values) % 8)
+        self._error = error
+
+    def isError(self):
+        return self._error
+
+
+class FakeClient:
+    """Device whose register at address a holds the value a (pymodbus 3.11 client signatures)."""
+
+    def __init__(self):
+        self.reads = []
+        self.writes = []
+        self.device_ids = []
+        self.fail_writes = False
+
+    def _read(self, address, *, count=1, device_id=1, no_response_expected=False):
+        self.device_ids.append(device_id)
+        self.reads.append((address, count))
+        eventlet.sleep(0)
+        return FakeResult(list(range(address, address + count)))
+
+    read_holding_registers = read_input_registers = _read
+    read_coils = read_discrete_inputs = _read
+
+    def write_registers(self, address, values, *, device_id=1, no_response_expected=False):
+        self.device_ids.append(device_id)
+        self.writes.append((address, list(values)))
+        return FakeResult([], error=self.fail_writes)
+
+    write_coils = write_registers
+
+
+class TestModbusBatchScheduler(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeClient()
+        patcher = patch.object(
+            modbus_batch_scheduler.modbus_client_pool, "run",
+            side_effect=lambda host, port, request: request(self.client),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.connection = 1
+        patcher = patch.object(
+            modbus_batch_scheduler.modbus_client_pool, "connection_id",
+            side_effect=lambda host, port: self.connection,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.scheduler = ModbusBatchScheduler()
+
+    def read_concurrently(self, register_type, windows):
+        pool = eventlet.GreenPool()
+        threads = [
+            pool.spawn(self.scheduler.read, "plc", 502, 1, register_type, start, count)
+            for start, count in windows
+        ]
+        return [thread.wait() for thread in threads]
+
+    def test_overlapping_reads_are_merged_and_sliced(self):
+        values = self.read_concurrently("holding", [(0, 4), (4, 2), (2, 3), (20, 1)])
+        self.assertEqual(values, [[0, 1, 2, 3], [4, 5], [2, 3, 4], [20]])
+        self.assertEqual(sorted(self.client.reads), [(0, 6), (20, 1)])
+
+    def test_merge_respects_the_request_size_limit(self):
+        self.read_concurrently("holding", [(0, 100), (100, 100)])
+        self.assertEqual(sorted(self.client.reads), [(0, 100), (100, 100)])
+
+    def test_bit_reads_have_the_same_length_merged_or_alone(self):
+        alone = self.read_concurrently("coil", [(0, 3)])[0]
+        merged = self.read_concurrently("coil", [(0, 3), (3, 2)])[0]
+        self.assertEqual(alone, [False, True, False])
+        self.assertEqual(alone, merged)
+
+    def test_requests_match_the_pymodbus_client_api(self):
+        # Autospec of the real client: wrong argument names or positions raise TypeError
+        self.client = create_autospec(ModbusTcpClient, instance=True)
+        self.client.read_coils.return_value.isError.return_value = False
+        self.client.read_coils.return_value.bits = [True, False, True, False]
+        self.client.write_registers.return_value.isError.return_value = False
+
+        self.assertEqual(self.scheduler.read("plc", 502, 7, "coil", 3, 3), [True, False, True])
+        self.client.read_coils.assert_called_once_with(3, count=3, device_id=7)
+        self.scheduler.write("plc", 502, 7, "holding", 10, [1, 2])
+        self.client.write_registers.assert_called_once_with(10, [1, 2], device_id=7)
+
+    def write(self, values):
+        return self.scheduler.write("plc", 502, 1, "holding", 10, values, only_changed=True)
+
+    def test_differential_write_sends_only_the_changed_span(self):
+        self.assertEqual(self.write([1, 2, 3, 4]), 4)
+        self.assertEqual(self.write([1, 9, 3, 8]), 3)
+        self.assertEqual(self.write([1, 9, 3, 8]), 0)
+        self.assertEqual(self.client.writes, [(10, [1, 2, 3, 4]), (11, [9, 3, 8])])
+
+    def test_reconnect_forgets_written_values(self):
+        self.write([1, 2, 3, 4])
+        self.connection += 1
+        self.assertEqual(self.write([1, 2, 3, 4]), 4)
+
+    def test_failed_write_forgets_written_values(self):
+        self.write([1, 2, 3, 4])
+        self.client.fail_writes = True
+        with self.assertRaises(Exception):
+            self.write([5, 2, 3, 4])
+        self.client.fail_writes = False
+        self.assertEqual(self.write([1, 2, 3, 4]), 4)
+
+    def test_written_values_expire(self):
+        self.write([1, 2, 3, 4])
+        with patch.object(modbus_batch_scheduler.time, "monotonic",
+                          return_value=modbus_batch_scheduler.time.monotonic() + 60):
+            self.assertEqual(self.write([1, 2, 3, 4]), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
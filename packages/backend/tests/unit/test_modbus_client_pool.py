@@ -0,0 +1,95 @@
+import unittest
+from unittest.mock import patch
+
+import eventlet
+from pymodbus.exceptions import ConnectionException
+
+from app.processors.utils import modbus_client_pool
+
+
+class FakeClient:
+    """ModbusTcpClient stand-in recording connects and closes."""
+
+    instances = []
+
+    def __init__(self, host, port=502):
+        self.host, self.port = host, port
+        self.connected = False
+        self.connects = self.closes = 0
+        FakeClient.instances.append(self)
+
+    def connect(self):
+        self.connects += 1
+        self.connected = True
+        return True
+
+    def close(self):
+        self.closes += 1
+        self.connected = False
+
+
+class TestModbusClientPool(unittest.TestCase):
+    def setUp(self):
+        FakeClient.instances = []
+        patcher = patch.object(modbus_client_pool, "ModbusTcpClient", FakeClient)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(modbus_client_pool.close_all)
+
+    def test_reuses_one_connection_per_device(self):
+        for _ in range(3):
+            self.assertEqual(modbus_client_pool.run("10.0.0.1", 502, lambda client: client.host), "10.0.0.1")
+        modbus_client_pool.run("10.0.0.1", 5020, lambda client: None)
+
+        self.assertEqual(len(FakeClient.instances), 2)
+        self.assertEqual(FakeClient.instances[0].connects, 1)
+
+    def test_stale_connection_is_replaced_and_retried_once(self):
+        calls = []
+
+        def flaky(client):
+            calls.append(client)
+            if len(calls) == 1:
+                raise ConnectionException("broken pipe")
+            return "ok"
+
+        first_id = modbus_client_pool.connection_id("10.0.0.2", 502)
+        self.assertEqual(modbus_client_pool.run("10.0.0.2", 502, flaky), "ok")
+        stale, fresh = calls
+        self.assertIsNot(stale, fresh)
+        self.assertEqual(stale.closes, 1)
+        self.assertEqual(modbus_client_pool.connection_id("10.0.0.2", 502), first_id + 2)
+
+        def broken(client):
+            raise ConnectionException("device offline")
+
+        with self.assertRaises(ConnectionException):
+            modbus_client_pool.run("10.0.0.2", 502, broken)
+
+    def test_evict_closes_the_client(self):
+        modbus_client_pool.run("10.0.0.3", 502, lambda client: None)
+        modbus_client_pool.evict("10.0.0.3", 502)
+        modbus_client_pool.run("10.0.0.3", 502, lambda client: None)
+
+        first, second = FakeClient.instances
+        self.assertEqual(first.closes, 1)
+        self.assertEqual(second.connects, 1)
+
+    def test_transactions_on_one_device_are_serialized(self):
+        active, overlaps = [], []
+
+        def request(client):
+            active.append(client)
+            overlaps.append(len(active))
+            eventlet.sleep(0.01)  # yields to the other greenthreads, like socket I/O
+            active.remove(client)
+
+        pool = eventlet.GreenPool()
+        for _ in range(4):
+            pool.spawn(modbus_client_pool.run, "10.0.0.4", 502, request)
+        pool.waitall()
+        self.assertEqual(overlaps, [1, 1, 1, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import json
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from app.processors.components.extension import modbus_input_processor
+from app.processors.components.extension.modbus_input_processor import ModbusInputProcessor
+from app.utils import processor_utils
+from app.utils.processor_utils import dumps_json
+
+
+def make_processor(register_type, count):
+    config = {
+        "name": "modbus",
+        "processorType": ModbusInputProcessor.processor_type,
+        "host": "10.0.0.5",
+        "port": 1502,
+        "unit_id": 3,
+        "register_type": register_type,
+        "start_address": 40,
+        "count": count,
+    }
+    return ModbusInputProcessor(config, None)
+
+
+class TestModbusInputProcessor(unittest.TestCase):
+    CASES = [("holding", [0, 1, 65535]), ("input", [7]), ("coil", [True, False, True, True])]
+
+    def _check_matches_full_dump(self):
+        for register_type, values in self.CASES:
+            # Built under the active JSON backend, like in a running flow
+            processor = make_processor(register_type, len(values))
+            with patch.object(modbus_input_processor.modbus_batch_scheduler, "read", return_value=values):
+                output = processor.process()
+            expected = dumps_json({
+                "host": "10.0.0.5",
+                "port": 1502,
+                "unit_id": 3,
+                "register_type": register_type,
+                "start_address": 40,
+                "count": len(values),
+                "values": np.asarray(values, dtype=processor._dtype),
+            })
+            self.assertEqual(output, expected)
+            self.assertEqual(json.loads(output)["values"], values)
+
+    @unittest.skipIf(processor_utils.orjson is None, "orjson not installed")
+    def test_prerendered_output_matches_orjson_dump(self):
+        self._check_matches_full_dump()
+
+    def test_prerendered_output_matches_stdlib_dump(self):
+        with patch.object(processor_utils, "orjson", None):
+            self._check_matches_full_dump()
+
+
+if __name__ == "__main__":
+    unittest.main()
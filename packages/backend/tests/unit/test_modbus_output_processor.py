@@ -0,0 +1,36 @@
+import struct
+import unittest
+
+from app.processors.components.extension.modbus_output_processor import (
+    ModbusOutputProcessor,
+)
+
+
+class TestModbusOutputProcessor(unittest.TestCase):
+    def test_coerce_structured_values(self):
+        self.assertEqual(ModbusOutputProcessor._coerce_values([1, 2.9, "3"]), [1, 2, 3])
+        self.assertEqual(ModbusOutputProcessor._coerce_values((4, 5)), [4, 5])
+        self.assertEqual(ModbusOutputProcessor._coerce_values({"values": [6, 7]}), [6, 7])
+        self.assertEqual(ModbusOutputProcessor._coerce_values(8), [8])
+
+    def test_coerce_big_endian_register_bytes(self):
+        raw = struct.pack(">3H", 1, 258, 65535)
+        self.assertEqual(list(ModbusOutputProcessor._coerce_values(raw)), [1, 258, 65535])
+
+    def test_coerce_json_text(self):
+        self.assertEqual(ModbusOutputProcessor._coerce_values("[1, 2, 3]"), [1, 2, 3])
+        self.assertEqual(ModbusOutputProcessor._coerce_values('{"values": [4, 5]}'), [4, 5])
+
+    def test_coerce_comma_separated_text_like_int_float(self):
+        for raw in ["1,2,3", "1, 2.5 ,3,", " -2.7 ,4", "1,,2", "7", ""]:
+            expected = [int(float(x)) for x in raw.split(",") if x.strip()]
+            self.assertEqual(ModbusOutputProcessor._coerce_values(raw), expected, raw)
+
+    def test_reject_non_numeric_and_non_finite_text(self):
+        for raw in ["a,b", "nan,1", "1,inf"]:
+            with self.assertRaises((ValueError, OverflowError), msg=raw):
+                ModbusOutputProcessor._coerce_values(raw)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import threading
+import unittest
+
+from app.processors.stream_scheduler import StreamScheduler
+
+
+class TestStreamScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = StreamScheduler(workers=1)
+        self.ran = []
+        self.done = threading.Event()
+
+    def _block_worker(self):
+        """Occupy the single worker until the returned event is set."""
+        started, release = threading.Event(), threading.Event()
+
+        def gate():
+            started.set()
+            release.wait(5)
+
+        self.scheduler.submit("gate", gate)
+        self.assertTrue(started.wait(5))
+        return release
+
+    def _record(self, key):
+        return lambda: self.ran.append(key)
+
+    def test_queued_streams_run_once_in_fifo_order(self):
+        release = self._block_worker()
+        self.scheduler.submit("cam-a", self._record("a1"))
+        self.scheduler.submit("cam-b", self._record("b"))
+        self.scheduler.submit("cam-a", self._record("a2"))  # already queued: not queued again
+        self.scheduler.submit("end", self.done.set)
+        release.set()
+
+        self.assertTrue(self.done.wait(5))
+        self.assertEqual(self.ran, ["a1", "b"])
+
+    def test_discard_drops_queued_work(self):
+        release = self._block_worker()
+        self.scheduler.submit("cam-a", self._record("a"))
+        self.scheduler.submit("cam-b", self._record("b"))
+        self.scheduler.discard("cam-a")
+        self.scheduler.submit("end", self.done.set)
+        release.set()
+
+        self.assertTrue(self.done.wait(5))
+        self.assertEqual(self.ran, ["b"])
+
+    def test_failing_task_does_not_stop_the_worker(self):
+        def broken():
+            raise RuntimeError("encoder failed")
+
+        with self.assertLogs(level="ERROR"):
+            self.scheduler.submit("cam-a", broken)
+            self.scheduler.submit("end", self.done.set)
+            self.assertTrue(self.done.wait(5))
+        self.done.clear()
+        self.scheduler.submit("end", self.done.set)
+        self.assertTrue(self.done.wait(5))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import importlib.util
+import threading
+import unittest
+from concurrent.futures import Future
+from contextlib import nullcontext
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+from PIL import Image
+
+HAS_YOLO_DEPS = all(importlib.util.find_spec(name) for name in ("torch", "ultralytics"))
+
+if HAS_YOLO_DEPS:
+    import torch
+
+    from app.processors.components.extension import yolo_detection_processor
+    from ultralytics.data.augment import LetterBox
+    from ultralytics.utils.ops import scale_boxes
+
+    from app.processors.components.extension.yolo_detection_processor import (
+        IMGSZ,
+        YOLODetectionProcessor,
+        _YOLOWorker,
+    )
+
+# (height, width): landscape, portrait, odd padding, upscaling, already square
+SHAPES = [(300, 500), (480, 270), (333, 517), (100, 80), (640, 640)]
+
+
+class FakeBuffer:
+    """Pinned-buffer stand-in: an Exception passed to copy_ is raised, like a failed CUDA copy."""
+
+    def copy_(self, tensor):
+        if isinstance(tensor, Exception):
+            raise tensor
+        self.value = tensor
+
+    def to(self, device, non_blocking=False):
+        gpu = MagicMock()
+        gpu.value = self.value
+        return gpu
+
+
+def double(gpu, **predict_kwargs):
+    return gpu.value * 2
+
+
+@unittest.skipUnless(HAS_YOLO_DEPS, "torch/ultralytics not installed")
+class TestYOLOWorker(unittest.TestCase):
+    def setUp(self):
+        # Fake CUDA: streams, events and pinned buffers without a device
+        for name in ("Stream", "Event", "current_stream"):
+            patcher = patch.object(torch.cuda, name, MagicMock())
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = patch.object(torch.cuda, "stream", lambda stream: nullcontext())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch.object(torch.Tensor, "pin_memory", lambda tensor: FakeBuffer())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.worker = _YOLOWorker()
+
+    def test_upload_failure_fails_request_and_keeps_worker(self):
+        with self.assertRaisesRegex(RuntimeError, "out of memory"):
+            self.worker.submit(double, RuntimeError("CUDA out of memory"))
+        self.assertTrue(self.worker._thread.is_alive())
+        self.assertEqual(self.worker.submit(double, 21), 42)
+
+    def test_inference_failure_keeps_worker(self):
+        def broken(gpu, **predict_kwargs):
+            raise ValueError("bad input")
+
+        with self.assertRaisesRegex(ValueError, "bad input"):
+            self.worker.submit(broken, 1)
+        self.assertEqual(self.worker.submit(double, 2), 4)
+
+    def test_submit_times_out_and_skips_cancelled_request(self):
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def blocking(gpu, **predict_kwargs):
+            calls.append(gpu.value)
+            started.set()
+            release.wait(5)
+            return gpu.value
+
+        busy = Future()
+        self.worker._queue.put((blocking, 1, {}, busy))
+        self.assertTrue(started.wait(5))
+        with patch.object(yolo_detection_processor, "SUBMIT_TIMEOUT", 0.2):
+            with self.assertRaisesRegex(Exception, "did not finish"):
+                self.worker.submit(blocking, 2)
+        release.set()
+        self.assertEqual(busy.result(timeout=5), 1)
+        # The timed-out request was still queued: it is dropped instead of run
+        self.assertEqual(self.worker.submit(double, 3), 6)
+        self.assertEqual(calls, [1])
+
+
+@unittest.skipUnless(HAS_YOLO_DEPS, "torch/ultralytics not installed")
+class TestYOLOPreprocessParity(unittest.TestCase):
+    """The letterbox and box mapping must match Ultralytics' own LetterBox and scale_boxes."""
+
+    def _images(self):
+        rng = np.random.default_rng(0)
+        for h, w in SHAPES:
+            yield rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+
+    def _reference(self, src):
+        letterboxed = LetterBox(new_shape=(IMGSZ, IMGSZ), auto=False)(image=src)
+        return letterboxed.transpose(2, 0, 1)[None].astype(np.float32) / 255
+
+    def test_cv2_letterbox_matches_ultralytics(self):
+        for src in self._images():
+            tensor, _ = YOLODetectionProcessor._preprocess(Image.fromarray(src))
+            np.testing.assert_array_equal(tensor.numpy(), self._reference(src))
+
+    def test_fused_letterbox_matches_ultralytics(self):
+        if yolo_detection_processor._letterbox_chw is None:
+            self.skipTest("numba not installed")
+        for src in self._images():
+            tensor, _ = YOLODetectionProcessor._preprocess(Image.fromarray(src), fused=True)
+            # Float bilinear vs cv2's rounded fixed-point resize: at most one intensity level
+            np.testing.assert_allclose(tensor.numpy(), self._reference(src), rtol=0, atol=1.001 / 255)
+
+    def test_scale_boxes_matches_ultralytics(self):
+        rng = np.random.default_rng(1)
+        for src in self._images():
+            h, w = src.shape[:2]
+            _, letterbox = YOLODetectionProcessor._preprocess(Image.fromarray(src))
+            corners = rng.uniform(0, IMGSZ, (20, 2, 2))  # (box, corner, xy)
+            xyxy = np.concatenate([corners.min(axis=1), corners.max(axis=1)], axis=1).astype(np.float32)
+            expected = scale_boxes((IMGSZ, IMGSZ), xyxy.copy(), (h, w))
+            actual = YOLODetectionProcessor._scale_boxes(xyxy.copy(), letterbox, w, h)
+            np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-3)
+
+
+if __name__ == "__main__":
+    unittest.main()